@@ -1,7 +1,7 @@
 # backend/api/routes/form_routes.py
 from fastapi import APIRouter, HTTPException, UploadFile, File, Form
 from fastapi.responses import JSONResponse
-from ...core.form_processor.factory import FormProcessorFactory
+from ...core._singletons import get_factory
 import logging
 import traceback
 from typing import Optional
@@ -58,8 +58,7 @@ async def process_form(form_data: dict):
             
         # Get appropriate processor
         try:
-            factory = FormProcessorFactory()
-            processor = factory.get_processor(form_type)
+            processor = get_factory().get_processor(form_type)
             print(f"Got processor: {processor.__class__.__name__}")
         except Exception as e:
             print(f"Error getting processor: {str(e)}")
@@ -129,8 +128,7 @@ async def process_form_upload(
         logger.info(f"Processing form upload with content type: {content_type}")
         
         # Get the appropriate processor for this content type
-        factory = FormProcessorFactory()
-        processor = factory.get_processor(content_type)
+        processor = get_factory().get_processor(content_type)
         
         if not processor:
             logger.error(f"Unsupported content type: {content_type}")
@@ -173,8 +171,7 @@ async def supported_formats():
     """
     Get a list of supported form formats.
     """
-    factory = FormProcessorFactory()
-    supported_types = factory.get_supported_types()
+    supported_types = get_factory().get_supported_types()
     
     # Format for display
     formatted_types = []
@@ -0,0 +1,41 @@
+# backend/conftest.py
+"""
+Shared pytest fixtures for the backend integration tests.
+Fixtures are module-scoped so each xdist worker builds them once.
+"""
+
+import sys
+import asyncio
+from pathlib import Path
+
+import pytest
+
+# Add the parent directory to the path so we can import our modules
+sys.path.append(str(Path(__file__).parent.parent))
+# The async copilot scripts import from the backend directory itself (core.ai...)
+sys.path.append(str(Path(__file__).parent))
+
+@pytest.fixture(scope="session")
+def event_loop():
+    """One event loop per worker, so HTTP sessions and connectors survive across async tests."""
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+@pytest.fixture(scope="module")
+def pdf_processor():
+    """A PDF processor instance."""
+    from backend.core.form_processor.pdf_processor import PDFFormProcessor
+    return PDFFormProcessor()
+
+@pytest.fixture(scope="module")
+def hybrid_copilot():
+    """The shared HybridCopilot instance, with its knowledge base loaded once per process."""
+    from backend.core._singletons import get_hybrid_copilot
+    return get_hybrid_copilot()
+
+@pytest.fixture(scope="module")
+def factory():
+    """The shared form processor factory."""
+    from backend.core._singletons import get_factory
+    return get_factory()
@@ -0,0 +1,115 @@
+# backend/copilot_harness.py
+"""
+Helpers shared by the copilot test scripts (test_smart_copilot.py and
+test_smart_integration.py): JSON Lines output, the API key marker, and the
+exact-prompt + semantic response caches.
+"""
+
+import os
+import json
+
+import pytest
+from dotenv import load_dotenv
+
+from core.ai.prompt_cache import key as prompt_key
+
+try:
+    import orjson
+
+    def dump_json(obj) -> bytes:
+        """Serialize to indented JSON bytes."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+
+    def dump_json_line(obj) -> bytes:
+        """Serialize to a single JSON Lines record."""
+        return orjson.dumps(obj) + b"\n"
+except ImportError:
+    def dump_json(obj) -> bytes:
+        """Serialize to indented JSON bytes."""
+        return json.dumps(obj, indent=2).encode()
+
+    def dump_json_line(obj) -> bytes:
+        """Serialize to a single JSON Lines record."""
+        return json.dumps(obj).encode() + b"\n"
+
+# These tests call the AI API, so they only run with a key configured
+load_dotenv()
+requires_api_key = pytest.mark.skipif(
+    not (os.getenv("OPENAI_API_KEY") or os.getenv("ANTHROPIC_API_KEY")),
+    reason="No OPENAI_API_KEY or ANTHROPIC_API_KEY configured"
+)
+
+def cache_enabled(use_cache=None):
+    """
+    Whether to reuse responses from earlier runs.
+
+    The script entry points pass an explicit setting. Under pytest, caching is
+    off unless COPILOT_TEST_CACHE=1, so a test run checks the live API rather
+    than replaying stored answers.
+    """
+    if use_cache is not None:
+        return use_cache
+    return os.getenv("COPILOT_TEST_CACHE", "0").lower() in ("1", "true", "yes")
+
+# Maximum number of test cases talking to the API at once
+MAX_CONCURRENT_REQUESTS = 4
+
+# HybridCopilot marks its fallback answers with this prefix outside production
+FALLBACK_PREFIX = "[FALLBACK: API unavailable]"
+
+def is_cacheable(result):
+    """Don't persist fallbacks, so a later run with the API up retries them."""
+    if isinstance(result, dict):
+        return result.get("source") != "fallback"
+    return not (isinstance(result, str) and result.startswith(FALLBACK_PREFIX))
+
+def semantic_key(question, field_context, form_context):
+    """Key for the semantic cache: (question, field_name, field_type, form_type)."""
+    return (
+        question,
+        field_context.get("name") if field_context else None,
+        field_context.get("type") if field_context else None,
+        form_context.get("form_type") if form_context else None
+    )
+
+def is_cached(caches, question, field_context, form_context):
+    """Whether a case would be answered from a cache without calling the copilot."""
+    prompt_cache, semantic_cache = caches
+    return (
+        prompt_key(question, field_context, form_context) in prompt_cache
+        or semantic_key(question, field_context, form_context) in semantic_cache
+    )
+
+async def get_cached_response(copilot, caches, question, field_context, form_context):
+    """
+    Get a response, trying the exact-prompt cache and then the semantic cache.
+
+    Args:
+        copilot: SmartCopilot or HybridCopilot
+        caches: (PromptCache, SemanticCache), or None to always call the copilot
+
+    Returns:
+        tuple: Response and whether it came from a cache
+    """
+    computed = False
+
+    async def compute():
+        nonlocal computed
+        computed = True
+        return await copilot.get_response(
+            question=question,
+            field_context=field_context,
+            form_context=form_context
+        )
+
+    if caches is None:
+        return await compute(), False
+
+    prompt_cache, semantic_cache = caches
+    result = await prompt_cache.get_or_compute(
+        prompt_key(question, field_context, form_context),
+        lambda: semantic_cache.get_or_compute(semantic_key(question, field_context, form_context), compute, store_if=is_cacheable),
+        # Only exact answers go in the exact-prompt cache, not semantic hits
+        store_if=lambda value: computed and is_cacheable(value)
+    )
+    return result, not computed
@@ -0,0 +1,26 @@
+# backend/core/_singletons.py
+"""
+Process-wide shared instances of expensive components.
+Building a HybridCopilot reads and parses the knowledge base from disk, so
+callers that only need one instance per process should use these accessors.
+"""
+
+from functools import lru_cache
+
+@lru_cache(maxsize=1)
+def get_hybrid_copilot():
+    """Get the shared HybridCopilot instance."""
+    from .ai.hybrid_copilot import HybridCopilot
+    return HybridCopilot()
+
+@lru_cache(maxsize=1)
+def get_ai_copilot():
+    """Get the shared AICopilot instance."""
+    from .ai.copilot import AICopilot
+    return AICopilot()
+
+@lru_cache(maxsize=1)
+def get_factory():
+    """Get the shared FormProcessorFactory instance."""
+    from .form_processor.factory import FormProcessorFactory
+    return FormProcessorFactory()
@@ -0,0 +1,16 @@
+# backend/core/ai/capabilities.py
+"""
+Capability flags reported in a copilot response's "capabilities" bitmask.
+Kept in their own module so callers can test a response without importing
+the copilots themselves.
+"""
+
+# Response was produced by SmartCopilot
+SMART_CAP = 1
+# The question was answered with SmartCopilot's enhanced (analyzed) context
+ENHANCED_CAP = 2
+# Form/field context enhancement contributed to the answer
+CTX_CAP = 4
+
+# Any of the above means SmartCopilot capabilities were used
+SMART_CAPS = SMART_CAP | ENHANCED_CAP | CTX_CAP
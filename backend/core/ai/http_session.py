@@ -0,0 +1,82 @@
+# backend/core/ai/http_session.py
+"""
+Shared HTTP session for the copilot API clients.
+Passing one session to SmartCopilot/HybridCopilot lets every API call reuse
+pooled connections instead of paying DNS + TLS setup on each request.
+"""
+
+import ssl
+from contextlib import asynccontextmanager
+from typing import Optional
+
+import aiohttp
+
+def _ssl_setting(disable_ssl_verification: bool):
+    """
+    Get the TCPConnector ssl argument for a copilot's SSL setting.
+
+    Args:
+        disable_ssl_verification: Skip certificate and hostname checks
+
+    Returns:
+        An SSL context that doesn't verify certificates, or None for aiohttp's
+        default checks (older aiohttp reads ssl=True as "don't verify")
+    """
+    if not disable_ssl_verification:
+        return None
+
+    ssl_context = ssl.create_default_context()
+    ssl_context.check_hostname = False
+    ssl_context.verify_mode = ssl.CERT_NONE
+    return ssl_context
+
+def create_session(disable_ssl_verification: bool = True, limit: int = 32,
+                   total_timeout: float = 30) -> aiohttp.ClientSession:
+    """
+    Create a pooled HTTP session for copilot API calls.
+
+    Must be called from a running event loop; the caller owns the session
+    and should close it when done.
+
+    Args:
+        disable_ssl_verification: Skip certificate checks - should match the
+            copilots the session is passed to
+        limit: Maximum number of simultaneous connections
+        total_timeout: Overall timeout in seconds for a request
+
+    Returns:
+        aiohttp.ClientSession
+    """
+    connector = aiohttp.TCPConnector(
+        limit=limit,
+        ttl_dns_cache=300,
+        ssl=_ssl_setting(disable_ssl_verification)
+    )
+    return aiohttp.ClientSession(
+        connector=connector,
+        timeout=aiohttp.ClientTimeout(total=total_timeout)
+    )
+
+@asynccontextmanager
+async def client_session(session: Optional[aiohttp.ClientSession] = None,
+                         disable_ssl_verification: bool = True):
+    """
+    Yield an HTTP session for one API call.
+
+    Reuses the given shared session (whose connector owns the SSL settings)
+    when there is one, otherwise opens a session for this call.
+
+    Args:
+        session: Shared session to reuse, or None
+        disable_ssl_verification: Skip certificate checks on a per-call session
+
+    Yields:
+        aiohttp.ClientSession
+    """
+    if session is not None:
+        yield session
+        return
+
+    connector = aiohttp.TCPConnector(ssl=_ssl_setting(disable_ssl_verification))
+    async with aiohttp.ClientSession(connector=connector) as call_session:
+        yield call_session
@@ -2,13 +2,14 @@ import os
 import json
 import time
 import logging
-import ssl
 import traceback
 from typing import Dict, Any, Optional
 import aiohttp
 from threading import Lock
 from dotenv import load_dotenv
 
+from .http_session import client_session
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -32,7 +33,7 @@ class HybridCopilot:
     still providing flexibility for complex or unusual queries.
     """
     
-    def __init__(self, disable_ssl_verification=True):
+    def __init__(self, disable_ssl_verification=True, session: Optional[aiohttp.ClientSession] = None):
         """Initialize the hybrid copilot system."""
         # Load hardcoded responses
         self.knowledge_base = self._load_knowledge_base()
@@ -48,6 +49,9 @@ class HybridCopilot:
         # SSL verification setting
         self.disable_ssl_verification = disable_ssl_verification
         
+        # Optional shared HTTP session; when None each API call opens its own
+        self.session = session
+        
         # Log API key status (safely)
         if self.api_key:
             masked_key = f"{self.api_key[:5]}...{self.api_key[-4:]}" if len(self.api_key) > 10 else "***"
@@ -116,7 +120,7 @@ class HybridCopilot:
             try:
                 logger.info("Trying SmartCopilot for enhanced response")
                 # Initialize SmartCopilot if not already done
-                smart_copilot = SmartCopilot(disable_ssl_verification=self.disable_ssl_verification)
+                smart_copilot = SmartCopilot(disable_ssl_verification=self.disable_ssl_verification, session=self.session)
                 
                 # Get enhanced response from SmartCopilot
                 smart_response = await smart_copilot.get_response(
@@ -366,16 +370,7 @@ When answering questions:
 
 Your goal is to be genuinely helpful by providing clear, contextual information about form fields."""
 
-        # Create a custom SSL context if SSL verification is disabled
-        ssl_context = None
-        if self.disable_ssl_verification:
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-
-        connector = aiohttp.TCPConnector(ssl=ssl_context) if self.disable_ssl_verification else None
-
-        async with aiohttp.ClientSession(connector=connector) as session:
+        async with client_session(self.session, self.disable_ssl_verification) as session:
             try:
                 logger.info("Sending request to OpenAI API...")
                 
@@ -436,16 +431,7 @@ Your goal is to be genuinely helpful by providing clear, contextual information
         Returns:
             str: API response or None if failed
         """
-        # Create a custom SSL context if SSL verification is disabled
-        ssl_context = None
-        if self.disable_ssl_verification:
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-
-        connector = aiohttp.TCPConnector(ssl=ssl_context) if self.disable_ssl_verification else None
-
-        async with aiohttp.ClientSession(connector=connector) as session:
+        async with client_session(self.session, self.disable_ssl_verification) as session:
             try:
                 logger.info("Sending request to Anthropic API...")
                 
@@ -549,17 +535,8 @@ Your goal is to be genuinely helpful by providing clear, contextual information
             logger.error("No API key found!")
             return {"success": False, "error": "No API key"}
         
-        # Create a custom SSL context if SSL verification is disabled
-        ssl_context = None
-        if self.disable_ssl_verification:
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-
-        connector = aiohttp.TCPConnector(ssl=ssl_context) if self.disable_ssl_verification else None
-        
         try:
-            async with aiohttp.ClientSession(connector=connector) as session:
+            async with client_session(self.session, self.disable_ssl_verification) as session:
                 payload = {
                     "model": "gpt-3.5-turbo",
                     "messages": [
@@ -0,0 +1,113 @@
+# backend/core/ai/prompt_cache.py
+"""
+Disk-backed exact-prompt cache for copilot responses.
+Responses are keyed on a hash of the full (question, field context, form
+context) triple, so re-running the same prompts skips the LLM entirely.
+Uses diskcache when installed, falling back to the stdlib shelve module.
+"""
+
+import os
+import json
+import time
+import shelve
+import hashlib
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+try:
+    import diskcache
+    DISKCACHE_AVAILABLE = True
+except ImportError:
+    DISKCACHE_AVAILABLE = False
+
+logger = logging.getLogger("prompt_cache")
+
+def key(question: str, field_context: Optional[Dict[str, Any]], form_context: Optional[Dict[str, Any]]) -> str:
+    """
+    Build a stable cache key for a prompt.
+
+    Args:
+        question: User's question
+        field_context: Optional context about the form field
+        form_context: Optional context about the overall form
+
+    Returns:
+        str: Hex digest of the prompt triple
+    """
+    payload = json.dumps([question, field_context, form_context], sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode()).hexdigest()
+
+class PromptCache:
+    """
+    Exact-match response cache persisted on disk.
+    """
+
+    def __init__(self, directory: str, expire: float = 86400):
+        """
+        Open (or create) the cache.
+
+        Args:
+            directory: Directory holding the cache files
+            expire: Seconds before an entry goes stale
+        """
+        self.expire = expire
+        os.makedirs(directory, exist_ok=True)
+
+        if DISKCACHE_AVAILABLE:
+            self.store = diskcache.Cache(directory)
+        else:
+            self.store = shelve.open(os.path.join(directory, "prompt_cache"))
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, cache_key: str) -> Optional[Any]:
+        """Return the cached value for a key, or None if missing or stale."""
+        entry = self.store.get(cache_key)
+        if entry is None:
+            return None
+
+        expires_at, value = entry
+        if time.time() > expires_at:
+            return None
+        return value
+
+    def __contains__(self, cache_key: str) -> bool:
+        """Whether a fresh entry exists for a key."""
+        return self.get(cache_key) is not None
+
+    def set(self, cache_key: str, value: Any):
+        """Store a value for a key."""
+        self.store[cache_key] = (time.time() + self.expire, value)
+
+    async def get_or_compute(self, cache_key: str, compute: Callable[[], Awaitable[Any]],
+                             store_if: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Return the cached value for a key, or compute and store it.
+
+        Args:
+            cache_key: Key from key()
+            compute: Zero-argument callable returning an awaitable of the value
+            store_if: Optional predicate; values it rejects are returned but not cached
+
+        Returns:
+            The cached or freshly computed value
+        """
+        value = self.get(cache_key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = await compute()
+        if store_if is None or store_if(value):
+            self.set(cache_key, value)
+        return value
+
+    def close(self):
+        """Flush and close the underlying store."""
+        self.store.close()
+
+    def get_stats(self) -> dict:
+        """Hit/miss counters."""
+        return {"hits": self.hits, "misses": self.misses}
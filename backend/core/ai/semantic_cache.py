@@ -0,0 +1,221 @@
+# backend/core/ai/semantic_cache.py
+"""
+Response cache that also matches semantically similar questions.
+Entries are keyed by (question, field_name, field_type, form_type). An exact-match dict
+is checked first, so identical re-runs never load the embedding model; on a
+miss the key is embedded and compared against earlier entries by cosine
+similarity. Semantic hits are returned but never stored under the new key,
+so an approximate answer can't turn into an exact one. Without
+sentence-transformers/faiss installed the cache still
+works, exact matches only. Entries expire like PromptCache's, so the cache
+behind it never serves something PromptCache has already dropped.
+"""
+
+import os
+import asyncio
+import hashlib
+import logging
+import pickle
+import threading
+import time
+from typing import Any, Awaitable, Callable, Optional, Tuple
+
+try:
+    import numpy as np
+    import faiss
+    from sentence_transformers import SentenceTransformer
+    SEMANTIC_AVAILABLE = True
+except ImportError:
+    SEMANTIC_AVAILABLE = False
+
+logger = logging.getLogger("semantic_cache")
+
+CacheKey = Tuple[Optional[str], Optional[str], Optional[str], Optional[str]]
+
+class SemanticCache:
+    """
+    Exact + embedding-similarity cache for copilot responses.
+    """
+
+    def __init__(self, path: Optional[str] = None, threshold: float = 0.92,
+                 model_name: str = "all-MiniLM-L6-v2", expire: float = 86400):
+        """
+        Initialize the cache, loading earlier entries from disk if present.
+
+        Args:
+            path: Optional pickle file to persist entries to
+            threshold: Minimum cosine similarity for a semantic hit
+            model_name: sentence-transformers model used for embeddings
+            expire: Seconds before an entry goes stale
+        """
+        self.path = path
+        self.threshold = threshold
+        self.model_name = model_name
+        self.expire = expire
+
+        # digest -> (expires_at, value), for exact matches
+        self.exact = {}
+        # Parallel lists of (expires_at, value) entries and their normalized
+        # embeddings; row i of the index is entry i
+        self.values = []
+        self.embeddings = []
+
+        # Loaded lazily on the first semantic lookup
+        self.model = None
+        self.index = None
+
+        # Semantic lookups run in worker threads, so the model load and every
+        # index access (build, search, add) happen under this lock
+        self._lock = threading.Lock()
+
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+        if path and os.path.exists(path):
+            self._load()
+
+    @staticmethod
+    def _key_text(key: CacheKey) -> str:
+        """Render a (question, field_name, field_type, form_type) key as a single string."""
+        question, field_name, field_type, form_type = key
+        return f"{form_type or ''} | {field_name or ''} | {field_type or ''} | {question or ''}"
+
+    @staticmethod
+    def _digest(text: str) -> str:
+        """Exact-match digest for a rendered key."""
+        return hashlib.blake2b(text.encode()).hexdigest()
+
+    def _get_exact(self, digest: str):
+        """Return the fresh exact-match value for a digest, or None."""
+        entry = self.exact.get(digest)
+        if entry is None or time.time() > entry[0]:
+            return None
+        return entry[1]
+
+    def __contains__(self, key: CacheKey) -> bool:
+        """Whether the key has a fresh exact match; never loads the embedding model."""
+        return self._get_exact(self._digest(self._key_text(key))) is not None
+
+    def _embed(self, text: str):
+        """Embed a key as a normalized float32 row vector. Call with _lock held."""
+        if self.model is None:
+            logger.info(f"Loading embedding model {self.model_name}")
+            self.model = SentenceTransformer(self.model_name)
+        embedding = self.model.encode([text], normalize_embeddings=True)
+        return np.asarray(embedding, dtype=np.float32)
+
+    def _ensure_index(self, dim: int):
+        """Build the inner-product index, adding any embeddings loaded from disk. Call with _lock held."""
+        if self.index is None:
+            self.index = faiss.IndexFlatIP(dim)
+            if self.embeddings:
+                self.index.add(np.vstack(self.embeddings))
+
+    def _lookup_semantic(self, text: str):
+        """
+        Find the closest earlier entry that hasn't expired.
+
+        Returns:
+            tuple: (value or None, embedding)
+        """
+        with self._lock:
+            embedding = self._embed(text)
+            self._ensure_index(embedding.shape[1])
+            if self.index.ntotal:
+                scores, ids = self.index.search(embedding, 1)
+                if scores[0][0] >= self.threshold:
+                    expires_at, value = self.values[ids[0][0]]
+                    if time.time() <= expires_at:
+                        return value, embedding
+        return None, embedding
+
+    def _add_semantic(self, entry, embedding):
+        """Add an (expires_at, value) entry to the similarity index."""
+        with self._lock:
+            self.values.append(entry)
+            self.embeddings.append(embedding)
+            self.index.add(embedding)
+
+    async def get_or_compute(self, key: CacheKey, compute: Callable[[], Awaitable[Any]],
+                             store_if: Optional[Callable[[Any], bool]] = None) -> Any:
+        """
+        Return a cached value for the key, or compute and store it.
+
+        Args:
+            key: (question, field_name, field_type, form_type)
+            compute: Zero-argument callable returning an awaitable of the value
+            store_if: Optional predicate; values it rejects are returned but not cached
+
+        Returns:
+            The cached or freshly computed value
+        """
+        text = self._key_text(key)
+        digest = self._digest(text)
+
+        value = self._get_exact(digest)
+        if value is not None:
+            self.exact_hits += 1
+            return value
+
+        embedding = None
+        if SEMANTIC_AVAILABLE:
+            # Embedding is CPU-bound, keep it off the event loop
+            value, embedding = await asyncio.to_thread(self._lookup_semantic, text)
+            if value is not None:
+                self.semantic_hits += 1
+                return value
+
+        self.misses += 1
+        value = await compute()
+
+        if store_if is None or store_if(value):
+            entry = (time.time() + self.expire, value)
+            self.exact[digest] = entry
+            if embedding is not None:
+                await asyncio.to_thread(self._add_semantic, entry, embedding)
+
+        return value
+
+    def _load(self):
+        """Load persisted entries, dropping any that have expired."""
+        try:
+            with open(self.path, "rb") as f:
+                data = pickle.load(f)
+            now = time.time()
+            self.exact = {
+                digest: entry for digest, entry in data.get("exact", {}).items()
+                if now <= entry[0]
+            }
+            # Embeddings are only usable with the model that produced them
+            if SEMANTIC_AVAILABLE and data.get("model_name") == self.model_name:
+                for entry, embedding in zip(data.get("values", []), data.get("embeddings", [])):
+                    if now <= entry[0]:
+                        self.values.append(entry)
+                        self.embeddings.append(embedding)
+            logger.info(f"Loaded {len(self.exact)} cached responses from {self.path}")
+        except Exception as e:
+            logger.warning(f"Could not load semantic cache from {self.path}: {e}")
+
+    def save(self):
+        """Persist entries to the cache file, if one was given."""
+        if not self.path:
+            return
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with self._lock, open(self.path, "wb") as f:
+            pickle.dump({
+                "model_name": self.model_name,
+                "exact": self.exact,
+                "values": self.values,
+                "embeddings": self.embeddings
+            }, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def get_stats(self) -> dict:
+        """Hit/miss counters."""
+        return {
+            "exact_hits": self.exact_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "entries": len(self.exact)
+        }
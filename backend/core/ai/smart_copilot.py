@@ -3,7 +3,6 @@
 import os
 import json
 import logging
-import ssl
 import time
 import asyncio
 from typing import Dict, List, Any, Optional, Union
@@ -13,6 +12,8 @@ from threading import Lock
 
 from dotenv import load_dotenv
 from .form_context_analyzer import FormContextAnalyzer
+from .capabilities import SMART_CAP, ENHANCED_CAP, CTX_CAP
+from .http_session import client_session
 
 # Import prompts
 from .prompts.enhanced_prompts import (
@@ -42,7 +43,7 @@ class SmartCopilot:
     5. Response caching with threading support
     """
     
-    def __init__(self, disable_ssl_verification=True):
+    def __init__(self, disable_ssl_verification=True, session: Optional[aiohttp.ClientSession] = None):
         """Initialize the smart copilot system."""
         # Load form context analyzer
         self.analyzer = FormContextAnalyzer()
@@ -58,6 +59,9 @@ class SmartCopilot:
         # SSL verification setting
         self.disable_ssl_verification = disable_ssl_verification
         
+        # Optional shared HTTP session; when None each API call opens its own
+        self.session = session
+        
         # Set up response cache with thread safety
         self.response_cache = {}
         self.cache_expiry = 3600 * 24 * 7  # 1 week by default
@@ -89,7 +93,7 @@ class SmartCopilot:
         Returns:
             Dict with response and metadata
         """
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         
         # Generate cache key
         cache_key = f"{question}|{json.dumps(field_context) if field_context else ''}|{json.dumps(form_context) if form_context else ''}"
@@ -104,8 +108,10 @@ class SmartCopilot:
                 "response": cached,
                 "source": "cache",
                 "processing_time": 0.0,
+                "processing_time_ns": 0,
                 "cached": True,
                 "enhanced_context_used": True,
+                "capabilities": SMART_CAP | ENHANCED_CAP,
                 "model": "cached"
             }
         
@@ -117,7 +123,7 @@ class SmartCopilot:
         if kb_response:
             logger.info("Using knowledge base response")
             self.knowledge_base_hits += 1
-            processing_time = time.time() - start_time
+            processing_time_ns = time.perf_counter_ns() - start_ns
             
             # Cache the response
             self._cache_response(cache_key, kb_response)
@@ -126,9 +132,11 @@ class SmartCopilot:
             return {
                 "response": kb_response,
                 "source": "knowledge_base",
-                "processing_time": processing_time,
+                "processing_time": processing_time_ns / 1e9,
+                "processing_time_ns": processing_time_ns,
                 "cached": False,
                 "enhanced_context_used": True,
+                "capabilities": SMART_CAP | ENHANCED_CAP | (CTX_CAP if enhanced_context else 0),
                 "field_category": enhanced_context.get("field_category", "unknown") if field_context else None,
                 "question_type": enhanced_context.get("question_type", "unknown")
             }
@@ -153,16 +161,18 @@ class SmartCopilot:
                     # Cache the response
                     self._cache_response(cache_key, api_response)
                     
-                    processing_time = time.time() - start_time
+                    processing_time_ns = time.perf_counter_ns() - start_ns
                     
                     # Create response with metadata
                     return {
                         "response": api_response,
                         "source": "api",
                         "model": self.openai_model if self.api_provider == "openai" else self.anthropic_model,
-                        "processing_time": processing_time,
+                        "processing_time": processing_time_ns / 1e9,
+                        "processing_time_ns": processing_time_ns,
                         "cached": False,
                         "enhanced_context_used": True,
+                        "capabilities": SMART_CAP | ENHANCED_CAP | (CTX_CAP if enhanced_context else 0),
                         "prompt_template": prompt_template.__name__ if hasattr(prompt_template, "__name__") else "custom",
                         "context_enhancement": list(enhanced_context.keys())
                     }
@@ -182,16 +192,18 @@ class SmartCopilot:
         if os.getenv("ENVIRONMENT") != "production":
             fallback = f"[FALLBACK: API unavailable] {fallback}"
             
-        processing_time = time.time() - start_time
+        processing_time_ns = time.perf_counter_ns() - start_ns
         self._cache_response(cache_key, fallback)
         
         # Create response with metadata
         return {
             "response": fallback,
             "source": "fallback",
-            "processing_time": processing_time,
+            "processing_time": processing_time_ns / 1e9,
+            "processing_time_ns": processing_time_ns,
             "cached": False,
             "enhanced_context_used": True,
+            "capabilities": SMART_CAP | ENHANCED_CAP | (CTX_CAP if enhanced_context else 0),
             "error": "API call failed or no API key available"
         }
     
@@ -629,20 +641,11 @@ class SmartCopilot:
         Returns:
             API response or None if failed
         """
-        # Create a custom SSL context if SSL verification is disabled
-        ssl_context = None
-        if self.disable_ssl_verification:
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-
-        connector = aiohttp.TCPConnector(ssl=ssl_context) if self.disable_ssl_verification else None
-        
         # Get configurable values from environment
         max_tokens = int(os.getenv("MAX_TOKENS", "800"))
         temperature = float(os.getenv("AI_TEMPERATURE", "0.7"))
 
-        async with aiohttp.ClientSession(connector=connector) as session:
+        async with client_session(self.session, self.disable_ssl_verification) as session:
             try:
                 logger.info("Sending request to OpenAI API...")
                 
@@ -692,20 +695,11 @@ class SmartCopilot:
         Returns:
             API response or None if failed
         """
-        # Create a custom SSL context if SSL verification is disabled
-        ssl_context = None
-        if self.disable_ssl_verification:
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-
-        connector = aiohttp.TCPConnector(ssl=ssl_context) if self.disable_ssl_verification else None
-        
         # Get configurable values from environment
         max_tokens = int(os.getenv("MAX_TOKENS", "800"))
         temperature = float(os.getenv("AI_TEMPERATURE", "0.7"))
 
-        async with aiohttp.ClientSession(connector=connector) as session:
+        async with client_session(self.session, self.disable_ssl_verification) as session:
             try:
                 logger.info("Sending request to Anthropic API...")
                 
@@ -0,0 +1,82 @@
+# backend/core/form_processor/_layout.py
+"""
+Geometric matching of OCR'd field labels to visually detected input boxes.
+The matching loop is compiled with Numba when it is installed and runs as
+plain Python otherwise. Compiled code is cached so later runs skip
+recompiling; Numba writes it to __pycache__ beside this file unless the
+NUMBA_CACHE_DIR environment variable points elsewhere.
+"""
+
+import math
+
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+def optional_jit(**options):
+    """Compile with numba.njit(**options) when Numba is available, else leave the function as is."""
+    if njit is None:
+        return lambda func: func
+    return njit(**options)
+
+@optional_jit(cache=True)
+def nearest_boxes(labels, label_pages, boxes, box_pages, max_distance):
+    """
+    Find the input box belonging to each label.
+
+    A box belongs to a label when it sits to the right of the label on the
+    same line, or directly below it; the nearest candidate on the same page
+    within max_distance wins.
+
+    Args:
+        labels: float32[:, 4] label bounding boxes as (x0, y0, x1, y1)
+        label_pages: int32[:] page number of each label
+        boxes: float32[:, 4] input boxes as (x0, y0, x1, y1)
+        box_pages: int32[:] page number of each box
+        max_distance: Largest label-to-box distance, in pixels
+
+    Returns:
+        int32[:]: Index into boxes for each label, or -1 if none is close enough
+    """
+    n_labels = labels.shape[0]
+    n_boxes = boxes.shape[0]
+    assignments = np.full(n_labels, -1, dtype=np.int32)
+
+    for i in range(n_labels):
+        lx0 = labels[i, 0]
+        ly0 = labels[i, 1]
+        lx1 = labels[i, 2]
+        ly1 = labels[i, 3]
+        label_mid_y = (ly0 + ly1) * 0.5
+        best = max_distance
+
+        for j in range(n_boxes):
+            if box_pages[j] != label_pages[i]:
+                continue
+
+            bx0 = boxes[j, 0]
+            by0 = boxes[j, 1]
+            by1 = boxes[j, 3]
+
+            # Box to the right of the label, compared along the text baseline
+            dx = bx0 - lx1
+            if dx >= 0:
+                dy = (by0 + by1) * 0.5 - label_mid_y
+                dist = math.sqrt(dx * dx + dy * dy)
+                if dist < best:
+                    best = dist
+                    assignments[i] = j
+
+            # Box below the label, compared from its left edge
+            dy = by0 - ly1
+            if dy >= 0:
+                dx = bx0 - lx0
+                dist = math.sqrt(dx * dx + dy * dy)
+                if dist < best:
+                    best = dist
+                    assignments[i] = j
+
+    return assignments
@@ -1,6 +1,7 @@
 # backend/core/form_processor/factory.py
 import logging
 import os
+import threading
 from typing import Dict, Optional
 
 from .html_processor import HTMLFormProcessor
@@ -40,6 +41,11 @@ class FormProcessorFactory:
             "tesseract_path": tesseract_path
         }
         
+        # PDF processors hold a persistent OCR engine, so one instance is
+        # shared by every request served through this factory
+        self._pdf_processor = None
+        self._pdf_processor_lock = threading.Lock()
+        
         logger.info(f"FormProcessorFactory initialized with {len(self._processor_types)} processor types")
     
     def get_processor(self, form_type: str):
@@ -67,10 +73,9 @@ class FormProcessorFactory:
         if form_type in self._processor_types:
             processor_class = self._processor_types[form_type]
             
-            # Initialize with config if it's a PDF processor
+            # Share the configured PDF processor
             if processor_class == PDFFormProcessor:
-                logger.info(f"Creating PDF processor with tesseract_path: {self._config.get('tesseract_path')}")
-                return processor_class(tesseract_path=self._config.get("tesseract_path"))
+                return self._get_pdf_processor()
             else:
                 logger.info(f"Creating processor of type: {processor_class.__name__}")
                 return processor_class()
@@ -80,9 +85,9 @@ class FormProcessorFactory:
             if form_type.startswith(processor_type) or processor_type in form_type:
                 logger.info(f"Found partial match processor for form type: {form_type} -> {processor_type}")
                 
-                # Initialize with config if it's a PDF processor
+                # Share the configured PDF processor
                 if processor_class == PDFFormProcessor:
-                    return processor_class(tesseract_path=self._config.get("tesseract_path"))
+                    return self._get_pdf_processor()
                 else:
                     return processor_class()
         
@@ -90,6 +95,26 @@ class FormProcessorFactory:
         logger.warning(f"Unsupported form type: {form_type}, defaulting to HTML processor")
         return HTMLFormProcessor()
     
+    def _get_pdf_processor(self):
+        """
+        Get the PDF processor shared by this factory, creating it on first use.
+        
+        Returns:
+            PDFFormProcessor: The shared PDF processor
+        """
+        with self._pdf_processor_lock:
+            if self._pdf_processor is None:
+                logger.info(f"Creating PDF processor with tesseract_path: {self._config.get('tesseract_path')}")
+                self._pdf_processor = PDFFormProcessor(tesseract_path=self._config.get("tesseract_path"))
+            return self._pdf_processor
+    
+    def close(self):
+        """Release resources held by the shared processors."""
+        with self._pdf_processor_lock:
+            if self._pdf_processor is not None:
+                self._pdf_processor.close()
+                self._pdf_processor = None
+    
     def register_processor(self, form_type: str, processor_class):
         """
         Register a new processor for a specific form type.
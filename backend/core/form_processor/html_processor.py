@@ -4,6 +4,10 @@ from bs4 import BeautifulSoup
 import logging
 import traceback
 
+# Parser used for form HTML. lxml is faster but builds different trees for
+# fragments and malformed markup, so production keeps the stdlib parser
+HTML_PARSER = 'html.parser'
+
 logger = logging.getLogger(__name__)
 
 class HTMLFormProcessor(BaseFormProcessor):
@@ -17,8 +21,19 @@ class HTMLFormProcessor(BaseFormProcessor):
             logger.debug(f"HTML preview: {html_content[:100]}...")
             
             # Parse HTML
-            soup = BeautifulSoup(html_content, 'html.parser')
+            soup = BeautifulSoup(html_content, HTML_PARSER)
+            
+            return self.extract_fields_from_soup(soup)
             
+        except Exception as e:
+            logger.error(f"ERROR parsing HTML: {str(e)}")
+            logger.error(traceback.format_exc())
+            # Return empty result rather than raising exception
+            return {"form_type": "html", "fields": [], "error": str(e)}
+    
+    def extract_fields_from_soup(self, soup) -> dict:
+        """Extract form fields from an already parsed BeautifulSoup document."""
+        try:
             # Find all forms
             forms = soup.find_all('form')
             logger.info(f"Found {len(forms)} form elements in HTML")
@@ -0,0 +1,91 @@
+# backend/core/form_processor/ocr_pool.py
+"""
+Process pool for OCRing the pages of a PDF in parallel.
+The worker functions live here rather than in the server module, so spawned
+workers only import the PDF processor. Each worker warms up its own shared
+PDFFormProcessor (libraries and OCR engine) as soon as it starts.
+"""
+
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+class OCRUnavailableError(Exception):
+    """Raised by an OCR worker that is missing the OCR libraries or tesseract."""
+
+def _missing_tool_errors():
+    """Errors meaning the PDF libraries, poppler or tesseract aren't installed."""
+    errors = [ImportError, OCRUnavailableError]
+    try:
+        from pdf2image.exceptions import PDFInfoNotInstalledError
+        errors.append(PDFInfoNotInstalledError)
+    except ImportError:
+        pass
+    try:
+        from pytesseract import TesseractNotFoundError
+        errors.append(TesseractNotFoundError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+# Callers fall back to a basic response when one of these is raised
+MISSING_TOOL_ERRORS = _missing_tool_errors()
+
+def _get_processor():
+    """Get this process's shared PDF processor."""
+    from .._singletons import get_factory
+    return get_factory().get_processor("application/pdf")
+
+def _init_worker():
+    """Load the OCR libraries and engine once, when the worker process starts."""
+    try:
+        _get_processor().warm_up()
+    except Exception as e:
+        # Leave the error to the first page, which reports it to the caller
+        logger.warning("OCR worker warmup failed: %s", e)
+
+def _started():
+    """No-op task used to start the pool's workers ahead of the first request."""
+
+def analyze_page_file(page_path, page_idx):
+    """
+    OCR one rendered PDF page. Runs in a pool worker process.
+
+    Args:
+        page_path: Path of the page image written by render_pages
+        page_idx: Zero-based page index
+
+    Returns:
+        dict: Page analysis from PDFFormProcessor.analyze_page
+    """
+    try:
+        return _get_processor().analyze_page_file(page_path, page_idx)
+    except MISSING_TOOL_ERRORS as e:
+        # Re-raise as a plain exception - TesseractNotFoundError can't be unpickled
+        raise OCRUnavailableError(str(e)) from None
+
+def create_pool(max_workers):
+    """
+    Create an OCR pool and start all of its workers.
+
+    Workers are spawned rather than forked, since the server process runs
+    an event loop and threads.
+
+    Args:
+        max_workers: Number of worker processes
+
+    Returns:
+        ProcessPoolExecutor
+    """
+    pool = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker
+    )
+    # Workers start on demand, and no worker is idle yet, so each submit
+    # starts one more process
+    for _ in range(max_workers):
+        pool.submit(_started)
+    return pool
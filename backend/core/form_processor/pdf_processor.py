@@ -3,6 +3,9 @@ from .base_processor import BaseFormProcessor
 import logging
 import re
 import io
+import bisect
+import tempfile
+import threading
 
 logger = logging.getLogger(__name__)
 
@@ -12,13 +15,19 @@ class PDFFormProcessor(BaseFormProcessor):
     Extracts form fields from PDF documents using OCR.
     """
     
-    def __init__(self, tesseract_path="/opt/homebrew/bin/tesseract", poppler_path="/opt/homebrew/bin"):
+    def __init__(self, tesseract_path="/opt/homebrew/bin/tesseract", poppler_path="/opt/homebrew/bin",
+                 detect_field_boxes=False, min_word_confidence=60, tessdata_path=None,
+                 include_text_content=False):
         """
         Initialize the PDF processor.
         
         Args:
             tesseract_path: Path to Tesseract executable (needed for Windows)
             poppler_path: Path to Poppler utilities (needed for PDF conversion)
+            detect_field_boxes: Also run the OpenCV contour pass to find empty field boxes
+            min_word_confidence: Minimum OCR confidence for a word box to be kept
+            tessdata_path: Path to the tessdata directory (used with tesserocr)
+            include_text_content: Include the full OCR text of every page in the result (for debugging)
         """
         # We'll lazily import these libraries when needed
         # to avoid dependencies if not using PDF processing
@@ -26,8 +35,18 @@ class PDFFormProcessor(BaseFormProcessor):
         self.pdf2image = None
         self.cv2 = None
         self.np = None
+        self.tesserocr = None
+        self.Image = None
         self.tesseract_path = tesseract_path
+        self.tessdata_path = tessdata_path
         self.poppler_path = poppler_path
+        self.detect_field_boxes = detect_field_boxes
+        self.min_word_confidence = min_word_confidence
+        self.include_text_content = include_text_content
+        
+        # Persistent tesserocr engine, shared across pages and requests
+        self._tess_api = None
+        self._tess_lock = threading.Lock()
         
         # Compile common form field patterns
         self.field_patterns = {
@@ -56,6 +75,14 @@ class PDFFormProcessor(BaseFormProcessor):
             "consent": r"(?i)(consent\s*form|release\s*form|authorization|permission)",
             "application": r"(?i)(application|apply|form|request)"
         }
+        
+        # Pre-compile both pattern sets into (name, pattern) tuples for fast iteration
+        self.field_patterns = tuple(
+            (name, re.compile(pattern)) for name, pattern in self.field_patterns.items()
+        )
+        self.form_type_patterns = tuple(
+            (name, re.compile(pattern)) for name, pattern in self.form_type_patterns.items()
+        )
     
     def extract_fields(self, pdf_bytes: bytes) -> dict:
         """
@@ -74,48 +101,17 @@ class PDFFormProcessor(BaseFormProcessor):
             
             logger.info("Processing PDF document")
             
-            # Convert PDF to images - now with poppler_path
-            images = self.pdf2image.convert_from_bytes(pdf_bytes, poppler_path=self.poppler_path)
-            logger.info(f"Converted PDF to {len(images)} images")
-            
-            all_text = []
-            all_field_boxes = []
-            
-            for i, image in enumerate(images):
-                # Convert PIL Image to numpy array
-                img_array = self.np.array(image)
-                
-                # Preprocess image
-                processed_img = self._enhance_image(img_array)
-                
-                # Extract text using OCR
-                text = self.pytesseract.image_to_string(processed_img)
-                logger.info(f"Extracted {len(text)} characters from page {i+1}")
-                all_text.append(text)
+            with tempfile.TemporaryDirectory() as output_folder:
+                page_paths = self.render_pages(pdf_bytes, output_folder)
                 
-                # Try to detect form fields visually (checkboxes, text fields, etc.)
-                field_boxes = self._detect_field_boxes(processed_img)
-                if field_boxes:
-                    all_field_boxes.extend([(i, box) for box in field_boxes])
+                # OCR one page at a time so only a single page image is held
+                # in memory at once
+                pages = [
+                    self.analyze_page_file(page_path, page_idx)
+                    for page_idx, page_path in enumerate(page_paths)
+                ]
             
-            # Identify fields using text analysis
-            text_fields = self._identify_fields(all_text)
-            
-            # Merge fields from text analysis and visual detection
-            merged_fields = self._merge_fields(text_fields, all_field_boxes)
-            
-            # Determine form type
-            form_type = self._detect_form_type("\n".join(all_text))
-            
-            result = {
-                "form_type": form_type,
-                "fields": merged_fields,
-                "page_count": len(images),
-                "text_content": all_text,  # Include full text for debugging
-                "confidence": 0.7  # OCR confidence is lower than HTML parsing
-            }
-            
-            return result
+            return self.build_result(pages)
             
         except ImportError as e:
             logger.error(f"Missing PDF processing dependencies: {str(e)}")
@@ -124,6 +120,127 @@ class PDFFormProcessor(BaseFormProcessor):
             logger.error(f"Error processing PDF: {str(e)}")
             raise Exception(f"PDF processing error: {str(e)}")
     
+    def render_pages(self, pdf, output_folder):
+        """
+        Render every page of a PDF to an image file with a single pdftoppm run.
+        
+        Args:
+            pdf: Raw PDF content as bytes, or the path of a PDF file
+            output_folder: Directory to write the page images to
+            
+        Returns:
+            list: Paths of the page images, in page order
+        """
+        if self.pdf2image is None:
+            self._import_dependencies()
+        
+        if isinstance(pdf, (bytes, bytearray)):
+            convert = self.pdf2image.convert_from_bytes
+        else:
+            convert = self.pdf2image.convert_from_path
+        
+        page_paths = convert(
+            pdf,
+            poppler_path=self.poppler_path,
+            output_folder=output_folder,
+            paths_only=True
+        )
+        logger.info(f"PDF has {len(page_paths)} pages")
+        return page_paths
+    
+    def analyze_page_file(self, page_path, page_idx):
+        """
+        OCR and analyze a page image file written by render_pages.
+        
+        Args:
+            page_path: Path of the page image
+            page_idx: Zero-based page index
+            
+        Returns:
+            dict: Page analysis, as returned by analyze_page
+        """
+        if self.Image is None:
+            self._import_dependencies()
+        
+        with self.Image.open(page_path) as image:
+            return self.analyze_page(image, page_idx)
+    
+    def analyze_page(self, image, page_idx):
+        """
+        OCR and analyze a single page image.
+        
+        Args:
+            image: PIL image of the page
+            page_idx: Zero-based page index
+            
+        Returns:
+            dict: The page index, its OCR text, visually detected field boxes
+            and the fields identified from its text
+        """
+        if self.pytesseract is None:
+            self._import_dependencies()
+        
+        # Convert PIL Image to numpy array and preprocess it
+        processed_img = self._enhance_image(self.np.array(image))
+        
+        # Extract text and word boxes in a single OCR pass
+        text, word_boxes = self._ocr_page(processed_img)
+        logger.info(f"Extracted {len(text)} characters from page {page_idx+1}")
+        
+        # Optionally detect form fields visually (checkboxes, text fields, etc.)
+        field_boxes = self._detect_field_boxes(processed_img) if self.detect_field_boxes else []
+        
+        # Identify fields using text analysis, and locate their labels
+        fields = self._identify_page_fields(text, page_idx)
+        self._attach_label_boxes(fields, text, word_boxes)
+        
+        return {
+            "page_idx": page_idx,
+            "text": text,
+            "field_boxes": field_boxes,
+            "fields": fields
+        }
+    
+    def build_result(self, pages):
+        """
+        Combine per-page analyses into the extract_fields result.
+        
+        Args:
+            pages: analyze_page results, in page order
+            
+        Returns:
+            dict: Dictionary with form information and extracted fields
+        """
+        text_fields = [field for page in pages for field in page["fields"]]
+        all_field_boxes = [(page["page_idx"], box) for page in pages for box in page["field_boxes"]]
+        
+        logger.info(f"Processed {len(pages)} pages")
+        logger.info(f"Identified {len(text_fields)} potential fields from text analysis")
+        
+        # Merge fields from text analysis and visual detection
+        merged_fields = self._merge_fields(text_fields, all_field_boxes)
+        
+        # Detect the form type page by page - the indicator is usually on page 1.
+        # Fall back to a generic form if no page matched a form type
+        form_type = None
+        for page in pages:
+            form_type = self._detect_form_type_single(page["text"])
+            if form_type is not None:
+                break
+        
+        result = {
+            "form_type": form_type or "generic_form",
+            "fields": merged_fields,
+            "page_count": len(pages),
+            "confidence": 0.7  # OCR confidence is lower than HTML parsing
+        }
+        
+        # Include full text only when explicitly requested for debugging
+        if self.include_text_content:
+            result["text_content"] = [page["text"] for page in pages]
+        
+        return result
+    
     def _import_dependencies(self):
         """Import required dependencies for PDF processing."""
         try:
@@ -131,16 +248,27 @@ class PDFFormProcessor(BaseFormProcessor):
             import pdf2image
             import cv2
             import numpy as np
+            from PIL import Image
             
             self.pytesseract = pytesseract
             self.pdf2image = pdf2image
             self.cv2 = cv2
             self.np = np
+            self.Image = Image
             
             # Set tesseract path if provided
             if self.tesseract_path:
                 self.pytesseract.pytesseract.tesseract_cmd = self.tesseract_path
             
+            # Prefer the in-process tesserocr API when it is installed
+            try:
+                import tesserocr
+                
+                self.tesserocr = tesserocr
+                logger.info("Using tesserocr for OCR")
+            except ImportError:
+                logger.info("tesserocr not available, falling back to pytesseract")
+            
             logger.info("Successfully imported PDF processing dependencies")
         except ImportError as e:
             logger.error(f"Failed to import PDF dependencies: {str(e)}")
@@ -174,6 +302,112 @@ class PDFFormProcessor(BaseFormProcessor):
         
         return opening
     
+    def warm_up(self):
+        """Import the PDF/OCR libraries and start the persistent OCR engine ahead of the first page."""
+        if self.pytesseract is None:
+            self._import_dependencies()
+        
+        if self.tesserocr is not None:
+            with self._tess_lock:
+                if self._tess_api is None:
+                    self._tess_api = self._create_tess_api()
+    
+    def _create_tess_api(self):
+        """Create a tesserocr engine. Call with _tess_lock held."""
+        if self.tessdata_path:
+            return self.tesserocr.PyTessBaseAPI(path=self.tessdata_path)
+        return self.tesserocr.PyTessBaseAPI()
+    
+    def close(self):
+        """Release the persistent OCR engine, if one was created."""
+        with self._tess_lock:
+            if self._tess_api is not None:
+                self._tess_api.End()
+                self._tess_api = None
+    
+    def _ocr_page(self, image):
+        """
+        Run OCR on a single page image.
+        Uses the persistent tesserocr engine when available, otherwise one
+        pytesseract image_to_data call, which returns both the recognized text
+        and word-level bounding boxes from Tesseract's own layout analysis.
+        
+        Args:
+            image: Preprocessed image
+            
+        Returns:
+            tuple: Page text and a list of (word, x, y, w, h, line_idx) for
+            confident words, where line_idx is the word's line in the text
+        """
+        if self.tesserocr is not None:
+            return self._ocr_page_tesserocr(image)
+        
+        data = self.pytesseract.image_to_data(image, output_type=self.pytesseract.Output.DICT)
+        
+        lines = []
+        word_boxes = []
+        current_line = None
+        for i, word in enumerate(data["text"]):
+            if not word.strip():
+                continue
+            
+            # Rebuild line breaks so the field patterns still match per line
+            line_key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+            if line_key != current_line:
+                lines.append([])
+                current_line = line_key
+            lines[-1].append(word)
+            
+            if float(data["conf"][i]) >= self.min_word_confidence:
+                word_boxes.append((word, data["left"][i], data["top"][i], data["width"][i], data["height"][i], len(lines) - 1))
+        
+        text = "\n".join(" ".join(line) for line in lines)
+        return text, word_boxes
+    
+    def _ocr_page_tesserocr(self, image):
+        """
+        Run OCR on a single page image with a persistent tesserocr engine.
+        The engine (and its language model) is loaded once and reused, instead
+        of spawning a tesseract process for every page.
+        
+        Args:
+            image: Preprocessed image
+            
+        Returns:
+            tuple: Page text and a list of (word, x, y, w, h, line_idx) for
+            confident words, where line_idx is the word's line in the text
+        """
+        word_level = self.tesserocr.RIL.WORD
+        line_level = self.tesserocr.RIL.TEXTLINE
+        
+        lines = []
+        word_boxes = []
+        
+        # The engine is not reentrant, so serialize access to it
+        with self._tess_lock:
+            if self._tess_api is None:
+                self._tess_api = self._create_tess_api()
+            
+            api = self._tess_api
+            api.SetImage(self.Image.fromarray(image))
+            api.Recognize()
+            
+            for result in self.tesserocr.iterate_level(api.GetIterator(), word_level):
+                word = result.GetUTF8Text(word_level)
+                if not word or not word.strip():
+                    continue
+                
+                if not lines or result.IsAtBeginningOf(line_level):
+                    lines.append([])
+                lines[-1].append(word)
+                
+                if result.Confidence(word_level) >= self.min_word_confidence:
+                    x1, y1, x2, y2 = result.BoundingBox(word_level)
+                    word_boxes.append((word, x1, y1, x2 - x1, y2 - y1, len(lines) - 1))
+        
+        text = "\n".join(" ".join(line) for line in lines)
+        return text, word_boxes
+    
     def _detect_field_boxes(self, image):
         """
         Detect form field boxes in the image using computer vision.
@@ -189,106 +423,147 @@ class PDFFormProcessor(BaseFormProcessor):
             # Invert image to find darker rectangles
             inverted = self.cv2.bitwise_not(image)
             
+            # Field boxes are large structures, so find contours on a
+            # half-resolution copy (a quarter of the pixels) and scale back up.
+            # OCR still runs on the full-resolution image.
+            scale = 2
+            small = self.cv2.resize(
+                inverted,
+                None,
+                fx=1 / scale,
+                fy=1 / scale,
+                interpolation=self.cv2.INTER_AREA
+            )
+            
             # Find contours
             contours, _ = self.cv2.findContours(
-                inverted, 
+                small, 
                 self.cv2.RETR_EXTERNAL, 
                 self.cv2.CHAIN_APPROX_SIMPLE
             )
             
-            field_boxes = []
+            # Only consider rectangles of appropriate size (full-resolution pixels)
+            min_width, min_height = 50, 15  # Minimum field size
+            max_width, max_height = 500, 80  # Maximum field size
+            
+            # Pre-size the output instead of growing a list of tuples
+            field_boxes = self.np.empty((len(contours), 4), dtype=self.np.int32)
+            box_count = 0
             for contour in contours:
-                # Filter contours by size and shape
+                # Filter by size first - boundingRect is cheap, and most
+                # contours on a page (letters, noise) are rejected here
+                x, y, w, h = (v * scale for v in self.cv2.boundingRect(contour))
+                if not (min_width < w < max_width and
+                        min_height < h < max_height and
+                        w > h):  # Fields are usually wider than tall
+                    continue
+                
+                # Only approximate the polygon for the surviving contours
                 perimeter = self.cv2.arcLength(contour, True)
                 approx = self.cv2.approxPolyDP(contour, 0.02 * perimeter, True)
                 
                 # Check if it's a quadrilateral (4 sides)
                 if len(approx) == 4:
-                    x, y, w, h = self.cv2.boundingRect(contour)
-                    
-                    # Only consider rectangles of appropriate size
-                    min_width, min_height = 50, 15  # Minimum field size
-                    max_width, max_height = 500, 80  # Maximum field size
-                    
-                    if (min_width < w < max_width and 
-                        min_height < h < max_height and
-                        w > h):  # Fields are usually wider than tall
-                        
-                        field_boxes.append((x, y, w, h))
+                    field_boxes[box_count] = (x, y, w, h)
+                    box_count += 1
             
-            logger.info(f"Detected {len(field_boxes)} potential field boxes")
-            return field_boxes
+            logger.info(f"Detected {box_count} potential field boxes")
+            return field_boxes[:box_count].tolist()
             
         except Exception as e:
             logger.error(f"Error detecting field boxes: {str(e)}")
             return []
     
-    def _identify_fields(self, text_blocks):
+    def _identify_page_fields(self, text, page_idx):
         """
-        Identify form fields from extracted text.
+        Identify form fields from the text of a single page.
         
         Args:
-            text_blocks: List of text blocks from each page
+            text: Text extracted from the page
+            page_idx: Zero-based page index
             
         Returns:
-            list: List of identified fields
+            list: List of identified fields on this page
         """
         fields = []
         
-        # Search for each pattern in the text
-        for page_idx, block in enumerate(text_blocks):
-            for field_type, pattern in self.field_patterns.items():
-                matches = re.finditer(pattern, block)
-                for match in matches:
-                    # Get the label and value
-                    label = match.group(1).strip()
-                    value = match.group(2).strip() if len(match.groups()) > 1 else ""
-                    
-                    # Calculate match position for potential field location
-                    pos = match.start()
-                    
-                    fields.append({
-                        "name": field_type,
-                        "label": label,
-                        "type": self._guess_field_type(field_type),
-                        "value": value,
-                        "page": page_idx + 1,
-                        "position": pos,
-                        "required": "*" in label or "required" in label.lower(),
-                        "confidence": 0.7  # OCR field detection confidence
-                    })
-        
-        logger.info(f"Identified {len(fields)} potential fields from text analysis")
+        for field_type, pattern in self.field_patterns:
+            matches = pattern.finditer(text)
+            for match in matches:
+                # Get the label and value
+                label = match.group(1).strip()
+                value = match.group(2).strip() if len(match.groups()) > 1 else ""
+                
+                # Calculate match position for potential field location
+                pos = match.start()
+                
+                fields.append({
+                    "name": field_type,
+                    "label": label,
+                    "type": self._guess_field_type(field_type),
+                    "value": value,
+                    "page": page_idx + 1,
+                    "position": pos,
+                    "required": "*" in label or "required" in label.lower(),
+                    "confidence": 0.7  # OCR field detection confidence
+                })
+        
         return fields
     
+    def _attach_label_boxes(self, fields, text, word_boxes):
+        """
+        Attach the OCR bounding box of each field label's first word.
+        Words are matched on the label's own line, so repeated labels on a
+        page each get their own box.
+        
+        Args:
+            fields: Fields identified from the page text
+            text: Text extracted from the page
+            word_boxes: (word, x, y, w, h, line_idx) boxes from the same OCR pass
+        """
+        line_words = {}
+        for word, x, y, w, h, line_idx in word_boxes:
+            line_words.setdefault((line_idx, word.lower().strip(":")), (x, y, w, h))
+        
+        # Offsets of the line breaks, to turn a match position into a line index
+        line_breaks = [i for i, char in enumerate(text) if char == "\n"]
+        
+        for field in fields:
+            label_words = field.get("label", "").split()
+            if label_words:
+                line_idx = bisect.bisect_right(line_breaks, field["position"])
+                bbox = line_words.get((line_idx, label_words[0].lower().strip(":")))
+                if bbox:
+                    field["bbox"] = bbox
+    
     def _merge_fields(self, text_fields, field_boxes):
         """
         Merge fields detected from text analysis and visual box detection.
         
         Args:
-            text_fields: Fields detected from text patterns
+            text_fields: Fields detected from text patterns, with label "bbox" set where found
             field_boxes: Visual boxes that might represent form fields
             
         Returns:
             list: Merged and deduplicated fields
         """
+        # Pair labelled fields with the input box beside or below them
+        if field_boxes:
+            self._attach_field_boxes(text_fields, field_boxes)
+        
         merged_fields = list(text_fields)  # Start with text fields
         
+        # Pages that already have text fields, bucketed once up front
+        pages_with_text = {field.get("page") for field in text_fields}
+        
         # Add visually detected fields that don't match existing ones
         box_fields_added = 0
         for page_idx, box in field_boxes:
             x, y, w, h = box
             
-            # Check if a text field is already nearby this box
-            matches_existing = False
-            for field in text_fields:
-                if field.get("page") == page_idx + 1:
-                    # Assume a match if positions are similar (simplified)
-                    # In a real implementation, this would need to compare actual pixel positions
-                    matches_existing = True
-                    break
-            
-            if not matches_existing:
+            # Assume a box matches an existing field if its page has text fields (simplified)
+            # In a real implementation, this would need to compare actual pixel positions
+            if (page_idx + 1) not in pages_with_text:
                 box_fields_added += 1
                 merged_fields.append({
                     "name": f"field_{page_idx}_{x}_{y}",
@@ -304,6 +579,43 @@ class PDFFormProcessor(BaseFormProcessor):
         logger.info(f"Added {box_fields_added} fields from visual detection")
         return merged_fields
     
+    def _attach_field_boxes(self, text_fields, field_boxes, max_distance=300.0):
+        """
+        Attach the nearest visually detected input box to each labelled text field.
+        
+        Args:
+            text_fields: Fields detected from text patterns, with label "bbox" set where found
+            field_boxes: (page_idx, (x, y, w, h)) visual boxes
+            max_distance: Largest label-to-box distance in pixels
+        """
+        from ._layout import nearest_boxes
+        
+        np = self.np
+        labelled = [field for field in text_fields if "bbox" in field]
+        if not labelled:
+            return
+        
+        # Build the coordinate arrays once; the matching pass runs over them only
+        n_labels, n_boxes = len(labelled), len(field_boxes)
+        labels = np.fromiter(
+            (v for field in labelled
+             for x, y, w, h in (field["bbox"],)
+             for v in (x, y, x + w, y + h)),
+            dtype=np.float32, count=n_labels * 4
+        ).reshape(n_labels, 4)
+        label_pages = np.fromiter((field["page"] for field in labelled), dtype=np.int32, count=n_labels)
+        boxes = np.fromiter(
+            (v for _, (x, y, w, h) in field_boxes for v in (x, y, x + w, y + h)),
+            dtype=np.float32, count=n_boxes * 4
+        ).reshape(n_boxes, 4)
+        box_pages = np.fromiter((page_idx + 1 for page_idx, _ in field_boxes), dtype=np.int32, count=n_boxes)
+        
+        assignments = nearest_boxes(labels, label_pages, boxes, box_pages, max_distance)
+        
+        for field, box_idx in zip(labelled, assignments.tolist()):
+            if box_idx >= 0:
+                field["box"] = tuple(field_boxes[box_idx][1])
+    
     def _guess_field_type(self, field_name):
         """
         Guess the field type based on field name.
@@ -333,21 +645,20 @@ class PDFFormProcessor(BaseFormProcessor):
         
         return field_type_map.get(field_name.lower(), "text")
     
-    def _detect_form_type(self, text):
+    def _detect_form_type_single(self, text):
         """
-        Detect the type of form based on text content.
+        Detect the form type from a single block of text, such as one page.
         
         Args:
-            text: The extracted text from the PDF
+            text: Text to search for form type indicators
             
         Returns:
-            String indicating form type or "generic_form"
+            String indicating form type, or None if no type matched
         """
-        text_lower = text.lower()
-        
-        for form_type, pattern in self.form_type_patterns.items():
-            if re.search(pattern, text_lower):
+        # The patterns are already case-insensitive, so search the original text
+        for form_type, pattern in self.form_type_patterns:
+            if pattern.search(text):
                 logger.info(f"Detected form type: {form_type}")
                 return form_type
         
-        return "generic_form"
\ No newline at end of file
+        return None
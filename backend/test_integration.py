@@ -3,14 +3,23 @@
 """
 Integration test script for the AI Form Helper project.
 This script tests the key components of the system to verify they're working correctly.
+
+Run with pytest; the tests are independent, so they can be spread across CPU
+cores (each worker builds its own module-scoped fixtures):
+
+    pytest backend/test_integration.py -n auto --dist=load
 """
 
 import os
 import sys
+import shutil
 import logging
-import json
+from functools import lru_cache
+from importlib import import_module
 from pathlib import Path
 
+import pytest
+
 # Add the parent directory to the path so we can import our modules
 sys.path.append(str(Path(__file__).parent.parent))
 
@@ -21,143 +30,126 @@ logging.basicConfig(
 )
 logger = logging.getLogger("integration_test")
 
+def cached_import(module_path, class_name):
+    """Import a class, skipping the import machinery if the module is already loaded."""
+    modules = sys.modules
+    if module_path not in modules or (
+        # The module may be partially initialized by a concurrent import
+        getattr(modules[module_path], "__spec__", None) is not None
+        and getattr(modules[module_path].__spec__, "_initializing", False) is True
+    ):
+        import_module(module_path)
+    return getattr(modules[module_path], class_name)
+
 def test_imports():
     """Test that all required modules can be imported."""
     logger.info("Testing imports...")
-    
+
     try:
         # Import form processor components
-        from backend.core.form_processor.factory import FormProcessorFactory
-        from backend.core.form_processor.html_processor import HTMLFormProcessor
-        from backend.core.form_processor.pdf_processor import PDFFormProcessor
-        from backend.core.form_processor.base_processor import BaseFormProcessor
-        
+        cached_import("backend.core.form_processor.factory", "FormProcessorFactory")
+        cached_import("backend.core.form_processor.html_processor", "HTMLFormProcessor")
+        cached_import("backend.core.form_processor.pdf_processor", "PDFFormProcessor")
+        cached_import("backend.core.form_processor.base_processor", "BaseFormProcessor")
+
         # Import AI components
-        from backend.core.ai.hybrid_copilot import HybridCopilot
-        
+        cached_import("backend.core.ai.hybrid_copilot", "HybridCopilot")
+
         logger.info("✅ All imports successful!")
-        return True
-    except ImportError as e:
+    except (ImportError, AttributeError) as e:
         logger.error(f"❌ Import error: {str(e)}")
         logger.error("Make sure all components are in the correct directories")
-        return False
+        pytest.fail(f"Import error: {e}")
 
-def test_pdf_processor():
+def test_pdf_processor(pdf_processor):
     """Test that the PDF processor can be initialized."""
     logger.info("Testing PDF processor initialization...")
-    
+    logger.info("✅ PDF processor initialized successfully!")
+
+    # Try to import dependencies
+    logger.info("Testing PDF processor dependencies...")
     try:
-        from backend.core.form_processor.pdf_processor import PDFFormProcessor
-        
-        processor = PDFFormProcessor()
-        logger.info("✅ PDF processor initialized successfully!")
-        
-        # Try to import dependencies
-        logger.info("Testing PDF processor dependencies...")
-        try:
-            processor._import_dependencies()
-            logger.info("✅ PDF processor dependencies loaded successfully!")
-            return True
-        except ImportError as e:
-            logger.error(f"❌ PDF processor dependency error: {str(e)}")
-            logger.error("Make sure you've installed: pytesseract, pdf2image, opencv-python, and numpy")
-            logger.error("Also verify that Tesseract OCR is installed on your system")
-            return False
-    except Exception as e:
-        logger.error(f"❌ PDF processor initialization error: {str(e)}")
-        return False
+        pdf_processor._import_dependencies()
+        logger.info("✅ PDF processor dependencies loaded successfully!")
+    except ImportError as e:
+        logger.error(f"❌ PDF processor dependency error: {str(e)}")
+        logger.error("Make sure you've installed: pytesseract, pdf2image, opencv-python, and numpy")
+        logger.error("Also verify that Tesseract OCR is installed on your system")
+        pytest.fail(f"PDF processor dependency error: {e}")
 
-def test_hybrid_copilot():
+def test_hybrid_copilot(hybrid_copilot):
     """Test that the hybrid copilot can be initialized and loaded."""
     logger.info("Testing HybridCopilot...")
-    
-    try:
-        from backend.core.ai.hybrid_copilot import HybridCopilot
-        
-        copilot = HybridCopilot()
-        kb_size = len(copilot.knowledge_base.get("fields", {}))
-        
-        if kb_size > 0:
-            logger.info(f"✅ HybridCopilot initialized with {kb_size} field entries in knowledge base!")
-        else:
-            logger.warning("⚠️ HybridCopilot initialized but knowledge base is empty")
-            logger.warning("Make sure field_knowledge.json is in the correct location")
-        
-        # Check if API integration is available
-        api_key = copilot.api_key
-        if api_key:
-            logger.info(f"✅ API integration available with provider: {copilot.api_provider}")
-        else:
-            logger.warning("⚠️ No API key found. External AI will not be available")
-            logger.warning("Set OPENAI_API_KEY or ANTHROPIC_API_KEY environment variable for full functionality")
-        
-        # Test a simple field query
-        field_context = {
-            "name": "email",
-            "label": "Email Address",
-            "type": "email",
-            "required": True
-        }
-        question = "What is this field for?"
-        
-        logger.info("Testing local knowledge base query...")
-        response = copilot._get_hardcoded_response(question, field_context)
-        
-        if response:
-            logger.info(f"✅ Successfully retrieved hardcoded response!")
-            logger.info(f"Response: {response[:50]}...")
-            return True
-        else:
-            logger.warning("⚠️ No hardcoded response found for test query")
-            return False
-            
-    except Exception as e:
-        logger.error(f"❌ HybridCopilot error: {str(e)}")
-        return False
 
-def test_processor_factory():
+    # Bind the attributes used below once
+    knowledge_base = hybrid_copilot.knowledge_base
+    api_key = hybrid_copilot.api_key
+    api_provider = hybrid_copilot.api_provider
+    get_hardcoded_response = hybrid_copilot._get_hardcoded_response
+
+    kb_size = len(knowledge_base.get("fields", {}))
+
+    if kb_size > 0:
+        logger.info(f"✅ HybridCopilot initialized with {kb_size} field entries in knowledge base!")
+    else:
+        logger.warning("⚠️ HybridCopilot initialized but knowledge base is empty")
+        logger.warning("Make sure field_knowledge.json is in the correct location")
+
+    # Check if API integration is available
+    if api_key:
+        logger.info(f"✅ API integration available with provider: {api_provider}")
+    else:
+        logger.warning("⚠️ No API key found. External AI will not be available")
+        logger.warning("Set OPENAI_API_KEY or ANTHROPIC_API_KEY environment variable for full functionality")
+
+    # Test a simple field query
+    field_context = {
+        "name": "email",
+        "label": "Email Address",
+        "type": "email",
+        "required": True
+    }
+    question = "What is this field for?"
+
+    logger.info("Testing local knowledge base query...")
+    response = get_hardcoded_response(question, field_context)
+
+    assert response, "No hardcoded response found for test query"
+    logger.info(f"✅ Successfully retrieved hardcoded response!")
+    logger.info(f"Response: {response[:50]}...")
+
+def test_processor_factory(factory):
     """Test that the form processor factory works correctly."""
     logger.info("Testing FormProcessorFactory...")
-    
-    try:
-        from backend.core.form_processor.factory import FormProcessorFactory
-        
-        factory = FormProcessorFactory()
-        
-        # Test HTML processor
-        html_processor = factory.get_processor("text/html")
-        if html_processor:
-            logger.info("✅ Successfully retrieved HTML processor!")
-        else:
-            logger.error("❌ Failed to retrieve HTML processor")
-            return False
-        
-        # Test PDF processor
-        pdf_processor = factory.get_processor("application/pdf")
-        if pdf_processor:
-            logger.info("✅ Successfully retrieved PDF processor!")
-        else:
-            logger.error("❌ Failed to retrieve PDF processor")
-            return False
-        
-        # Get supported types
-        types = factory.get_supported_types()
-        logger.info(f"Supported content types: {', '.join(types)}")
-        
-        return True
-    except Exception as e:
-        logger.error(f"❌ FormProcessorFactory error: {str(e)}")
-        return False
+
+    # Test HTML processor
+    html_processor = factory.get_processor("text/html")
+    assert html_processor, "Failed to retrieve HTML processor"
+    logger.info("✅ Successfully retrieved HTML processor!")
+
+    # Test PDF processor
+    pdf_processor = factory.get_processor("application/pdf")
+    assert pdf_processor, "Failed to retrieve PDF processor"
+    logger.info("✅ Successfully retrieved PDF processor!")
+
+    # Get supported types
+    types = factory.get_supported_types()
+    logger.info(f"Supported content types: {', '.join(types)}")
+
+@lru_cache(maxsize=1)
+def _tesseract_path():
+    """Locate the tesseract executable on PATH (a pure-Python scan, no subprocess)."""
+    return shutil.which("tesseract")
 
 def check_tesseract():
     """Check if Tesseract OCR is installed and available."""
     logger.info("Checking Tesseract OCR installation...")
-    
+
     # Check for TESSERACT_PATH environment variable
     tesseract_path = os.getenv("TESSERACT_PATH")
     if tesseract_path:
         logger.info(f"TESSERACT_PATH environment variable is set to: {tesseract_path}")
-        
+
         # Check if the file exists
         if os.path.exists(tesseract_path):
             logger.info(f"✅ Tesseract executable found at: {tesseract_path}")
@@ -166,72 +158,24 @@ def check_tesseract():
             return False
     else:
         # Try to detect tesseract in PATH
-        import subprocess
-        try:
-            # Run a simple command to check if tesseract is in PATH
-            subprocess.run(["tesseract", "--version"], 
-                          capture_output=True, 
-                          check=True,
-                          timeout=5)
-            logger.info("✅ Tesseract found in PATH")
+        path = _tesseract_path()
+        if path and os.path.exists(path):
+            logger.info(f"✅ Tesseract found in PATH: {path}")
             return True
-        except (subprocess.SubprocessError, FileNotFoundError):
+        else:
             logger.warning("⚠️ Tesseract not found in PATH")
             logger.warning("If you plan to process PDFs, please install Tesseract OCR")
             logger.warning("- Windows: https://github.com/UB-Mannheim/tesseract/wiki")
             logger.warning("- macOS: brew install tesseract")
             logger.warning("- Ubuntu: sudo apt-get install tesseract-ocr")
             return False
-    
+
     return True
 
-def main():
-    """Run all integration tests."""
-    logger.info("Starting integration tests...")
-    print("=" * 60)
-    print("AI FORM HELPER - INTEGRATION TEST")
-    print("=" * 60)
-    
-    # Track overall success
-    success = True
-    
-    # Run tests
-    if not test_imports():
-        success = False
-    
-    print("-" * 60)
-    
-    if not test_processor_factory():
-        success = False
-    
-    print("-" * 60)
-    
-    if not test_pdf_processor():
-        success = False
-        
-    print("-" * 60)
-    
-    if not test_hybrid_copilot():
-        success = False
-    
-    print("-" * 60)
-    
+def test_tesseract():
+    """Tesseract is only needed for PDFs, so a missing install is a skip, not a failure."""
     if not check_tesseract():
-        # This is a warning, not a failure
-        print("Tesseract OCR check: ⚠️ Warning")
-    
-    print("=" * 60)
-    
-    # Final result
-    if success:
-        print("🎉 All integration tests passed! Your system is ready. 🎉")
-        print("You can now run your server with: python backend/test_server.py")
-    else:
-        print("❌ Some tests failed. Please fix the issues before proceeding.")
-    
-    print("=" * 60)
-    
-    return 0 if success else 1
+        pytest.skip("Tesseract OCR is not installed")
 
 if __name__ == "__main__":
-    sys.exit(main())
\ No newline at end of file
+    sys.exit(pytest.main([__file__, "-n", "auto", "--dist=load"]))
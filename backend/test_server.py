@@ -2,11 +2,21 @@
 # Standalone test server for form helper extension
 
 import os
+import re
 import json
+import asyncio
 import logging
+import tempfile
+import threading
+from functools import lru_cache
+import orjson
 from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from fastapi.routing import APIRoute
 from pydantic import BaseModel
+from streaming_form_data import StreamingFormDataParser
+from streaming_form_data.targets import FileTarget, ValueTarget
 from typing import Dict, List, Optional, Any
 
 # Configure logging
@@ -16,37 +26,85 @@ logging.basicConfig(
 )
 logger = logging.getLogger("form_helper_api")
 
+# Input types recognized by the simple process-form field detection
+_FIELD_TYPES = ("text", "email", "password", "tel", "number", "checkbox", "radio")
+_FIELD_TYPE_RE = re.compile(r'type="(%s)"' % "|".join(_FIELD_TYPES), re.I)
+
+# Basic response for uploads that can't be processed
+_UPLOAD_STUB_RESPONSE = {
+    "form_type": "pdf_form",
+    "fields": (
+        {"name": "sample_name", "type": "text", "label": "Name"},
+        {"name": "sample_email", "type": "email", "label": "Email"},
+    ),
+}
+
 # Import routes from their proper modules
 try:
     from api.routes import form_routes, ai_routes
     logger.info("Successfully imported route modules")
     use_route_modules = True
 except ImportError as e:
-    logger.error(f"Error importing route modules: {e}")
+    logger.error("Error importing route modules: %s", e)
     logger.warning("Will use built-in routes instead")
     use_route_modules = False
 
+# Fallback answers for ask_question, checked in order against the question
+_FALLBACKS = (
+    (re.compile(r"password", re.I), "A good password should be at least 12 characters long with a mix of uppercase letters, lowercase letters, numbers, and special characters. Avoid using easily guessable information like your name or birthdate."),
+    (re.compile(r"email", re.I), "The email field is where you enter your email address. This is typically used for account creation, login, and communications from the service."),
+    (re.compile(r"name", re.I), "The name field is for entering your legal name as it appears on official documents. This helps verify your identity and ensures communications are addressed correctly."),
+    (re.compile(r"date|birth", re.I), "For date fields, enter the date in the format shown (typically MM/DD/YYYY in the US). This information is often used for verification and age-appropriate services."),
+)
+_DEFAULT_FALLBACK = "I'll help you understand this form. Feel free to ask about any specific field you're unsure about."
+
+def _fallback_for(question):
+    """Pick a canned answer for a question when the copilots are unavailable."""
+    for pattern, message in _FALLBACKS:
+        if pattern.search(question):
+            return message
+    return _DEFAULT_FALLBACK
+
+# Shared per-process copilot instances
+from core._singletons import get_ai_copilot, get_factory, get_hybrid_copilot
+from core.form_processor.ocr_pool import MISSING_TOOL_ERRORS, analyze_page_file, create_pool
+
+# OCR processes per server worker, so the pages of one PDF are OCR'd in parallel
+_OCR_WORKERS = max(1, (os.cpu_count() or 1) - 1)
+
+# Per-worker OCR process pool, created at startup
+_ocr_pool = None
+
+# AICopilot keeps per-form state (current_form, conversation_history) without
+# any synchronization, so calls into it run one at a time in worker threads
+_ai_copilot_lock = threading.Lock()
+
+def _call_ai_copilot(method, *args, **kwargs):
+    """Call an ai_copilot method while holding _ai_copilot_lock. Runs in a worker thread."""
+    with _ai_copilot_lock:
+        return method(*args, **kwargs)
+
+def _make_fallback_copilot():
+    """Build a minimal stand-in for AICopilot when the real one is unavailable."""
+    from types import SimpleNamespace
+    
+    return SimpleNamespace(
+        ask_question=lambda question, field_context=None: f"I received your question: '{question}'. However, the AI service is not fully initialized.",
+        explain_form_field=lambda field_name: f"The field '{field_name}' is used for entering information.",
+        set_form_context=lambda form_data: {"status": "success", "message": "Using fallback AI service"},
+        validate_field=lambda field_name, field_type, value: {"is_valid": True, "message": "Using fallback validation"},
+    )
+
 # Import the AICopilot as fallback
 try:
     from core.ai.copilot import AICopilot
     logger.info("Successfully imported AICopilot")
+    has_ai_copilot = True
 except ImportError as e:
-    logger.error(f"Error importing AICopilot: {e}")
-    # Create a fallback AICopilot if import fails
-    class FallbackAICopilot:
-        def ask_question(self, question, field_context=None):
-            return f"I received your question: '{question}'. However, the AI service is not fully initialized."
-            
-        def explain_form_field(self, field_name):
-            return f"The field '{field_name}' is used for entering information."
-            
-        def set_form_context(self, form_data):
-            return {"status": "success", "message": "Using fallback AI service"}
-            
-        def validate_field(self, field_name, field_type, value):
-            return {"is_valid": True, "message": "Using fallback validation"}
-    
-    AICopilot = FallbackAICopilot
+    logger.error("Error importing AICopilot: %s", e)
+    # Use a fallback AICopilot if import fails
+    AICopilot = _make_fallback_copilot
+    has_ai_copilot = False
     logger.warning("Using fallback AICopilot class")
 
 # Try to import HybridCopilot
@@ -55,12 +113,32 @@ try:
     logger.info("Successfully imported HybridCopilot")
     has_hybrid_copilot = True
 except ImportError as e:
-    logger.error(f"Error importing HybridCopilot: {e}")
+    logger.error("Error importing HybridCopilot: %s", e)
     logger.warning("HybridCopilot not available. Some AI features will be limited.")
     has_hybrid_copilot = False
 
+class ORJSONRequest(Request):
+    """Request that decodes JSON bodies with orjson instead of the stdlib json module."""
+    
+    async def json(self):
+        if not hasattr(self, "_json"):
+            self._json = orjson.loads(await self.body())
+        return self._json
+
+class ORJSONRoute(APIRoute):
+    """Route that hands its endpoint an ORJSONRequest, so body models are parsed with orjson."""
+    
+    def get_route_handler(self):
+        original_handler = super().get_route_handler()
+        
+        async def route_handler(request: Request):
+            return await original_handler(ORJSONRequest(request.scope, request.receive))
+        
+        return route_handler
+
 # Create FastAPI app
-app = FastAPI(title="Form Helper API")
+app = FastAPI(title="Form Helper API", default_response_class=ORJSONResponse)
+app.router.route_class = ORJSONRoute
 
 # Add CORS middleware to allow requests from extension
 app.add_middleware(
@@ -73,22 +151,62 @@ app.add_middleware(
 
 # Initialize the AI Copilot instances
 try:
-    ai_copilot = AICopilot()
+    ai_copilot = get_ai_copilot() if has_ai_copilot else AICopilot()
     logger.info("AICopilot initialized")
 except Exception as e:
-    logger.error(f"Error initializing AICopilot: {e}")
-    ai_copilot = FallbackAICopilot()
+    logger.error("Error initializing AICopilot: %s", e)
+    ai_copilot = _make_fallback_copilot()
     logger.warning("Using fallback AICopilot instance")
 
-# Initialize HybridCopilot if available
+# HybridCopilot is initialized at startup, so each worker process builds its own
 hybrid_copilot = None
-if has_hybrid_copilot:
+
+@app.on_event("startup")
+async def init_hybrid_copilot():
+    """Initialize HybridCopilot if available."""
+    global hybrid_copilot
+    if has_hybrid_copilot:
+        try:
+            hybrid_copilot = get_hybrid_copilot()
+            logger.info("HybridCopilot initialized")
+        except Exception as e:
+            logger.error("Error initializing HybridCopilot: %s", e)
+            logger.warning("HybridCopilot initialization failed")
+
+# Per-process memoization of knowledge base lookups - the panel repeats the
+# same requests on every field focus, and the knowledge base is read-only
+@lru_cache(maxsize=1024)
+def _cached_hardcoded(question, field_name, field_type, required):
+    """Look up a knowledge base answer, keyed on the only field context it depends on."""
+    field_context = {"name": field_name or "", "type": field_type or "", "required": required}
+    return hybrid_copilot._get_hardcoded_response(question, field_context)
+
+@app.on_event("startup")
+async def warmup_pdf_dependencies():
+    """Import the PDF libraries at startup so the first upload doesn't pay for it. OCR pool workers warm up separately."""
     try:
-        hybrid_copilot = HybridCopilot()
-        logger.info("HybridCopilot initialized")
+        pdf_processor = get_factory().get_processor("application/pdf")
+        await asyncio.to_thread(pdf_processor._import_dependencies)
+        logger.info("PDF dependencies pre-warmed")
     except Exception as e:
-        logger.error(f"Error initializing HybridCopilot: {e}")
-        logger.warning("HybridCopilot initialization failed")
+        logger.warning("PDF warmup failed: %s", e)
+
+@app.on_event("startup")
+async def start_ocr_pool():
+    """Create this worker's OCR pool, warming up every OCR process."""
+    global _ocr_pool
+    _ocr_pool = create_pool(_OCR_WORKERS)
+
+@app.on_event("shutdown")
+async def stop_ocr_pool():
+    """Shut down this worker's OCR pool."""
+    if _ocr_pool is not None:
+        _ocr_pool.shutdown(cancel_futures=True)
+
+@app.on_event("shutdown")
+async def close_pdf_processor():
+    """Release the shared PDF processor's OCR engine."""
+    get_factory().close()
 
 # If we have the route modules, use them
 if use_route_modules:
@@ -101,21 +219,28 @@ if use_route_modules:
     logger.info("Using imported route modules")
 else:
     # Define models for built-in routes
-    class FormProcessRequest(BaseModel):
+    class FrozenRequest(BaseModel):
+        """Base for request bodies - handlers only read them, so they are immutable."""
+        
+        class Config:
+            frozen = True
+            validate_assignment = False
+
+    class FormProcessRequest(FrozenRequest):
         type: str
         content: str
 
-    class FieldExplainRequest(BaseModel):
+    class FieldExplainRequest(FrozenRequest):
         field_name: str
 
-    class FieldQuestionRequest(BaseModel):
+    class FieldQuestionRequest(FrozenRequest):
         question: str
         field_name: Optional[str] = None
         field_context: Optional[Dict[str, Any]] = None
         form_context: Optional[Dict[str, Any]] = None
         chat_history: Optional[List[Dict[str, str]]] = None
         
-    class ValidationRequest(BaseModel):
+    class ValidationRequest(FrozenRequest):
         field_name: str
         field_type: str
         value: str
@@ -138,7 +263,7 @@ else:
     # Process form endpoint
     @app.post("/api/v1/process-form")
     async def process_form(request: FormProcessRequest):
-        logger.info(f"Process form called with type: {request.type}")
+        logger.info("Process form called with type: %s", request.type)
         try:
             # Simple field detection logic
             # In a real implementation, this would actually parse the HTML
@@ -147,119 +272,132 @@ else:
                 # In a real implementation, we would use BeautifulSoup
                 fields = []
                 
-                # Very simple field detection for testing
-                content = request.content.lower()
-                field_types = ["text", "email", "password", "tel", "number", "checkbox", "radio"]
+                # Very simple field detection for testing - one pass over the content
+                # Stop scanning once every known type has been seen
+                found = set()
+                for match in _FIELD_TYPE_RE.finditer(request.content):
+                    found.add(match.group(1).lower())
+                    if len(found) == len(_FIELD_TYPES):
+                        break
                 
-                for field_type in field_types:
-                    if f'type="{field_type}"' in content:
+                for field_type in _FIELD_TYPES:
+                    if field_type in found:
                         fields.append({
                             "name": f"sample_{field_type}_field",
                             "type": field_type,
                             "label": f"Sample {field_type.capitalize()} Field"
                         })
                 
-                logger.info(f"Detected {len(fields)} fields")
+                logger.info("Detected %s fields", len(fields))
                 return {
                     "form_type": "sample_form",
                     "fields": fields
                 }
             else:
-                logger.warning(f"Unsupported form type: {request.type}")
+                logger.warning("Unsupported form type: %s", request.type)
                 raise HTTPException(status_code=400, detail="Unsupported form type")
         except Exception as e:
-            logger.error(f"Error in process_form: {e}")
+            logger.error("Error in process_form: %s", e)
             raise HTTPException(status_code=500, detail=str(e))
 
     # Explain field endpoint - routes for both v1 and ai paths for compatibility
     @app.post("/api/v1/explain-field")
     @app.post("/api/v1/ai/explain-field")
     async def explain_field(request: FieldExplainRequest):
-        logger.info(f"Explain field called for field: {request.field_name}")
+        logger.info("Explain field called for field: %s", request.field_name)
         try:
             # Get explanation from AI Copilot
-            explanation = ai_copilot.explain_form_field(request.field_name)
-            logger.info(f"Generated explanation: {explanation[:50]}...")
+            explanation = await asyncio.to_thread(
+                _call_ai_copilot,
+                ai_copilot.explain_form_field,
+                request.field_name
+            )
+            logger.info("Generated explanation: %.50s...", explanation)
             return {"explanation": explanation}
         except Exception as e:
-            logger.error(f"Error in explain_field: {e}")
+            logger.error("Error in explain_field: %s", e)
             # Provide fallback explanation
             fallback = f"This field is for entering your {request.field_name.lower().replace('_', ' ')}."
-            logger.info(f"Using fallback explanation: {fallback}")
+            logger.info("Using fallback explanation: %s", fallback)
             return {"explanation": fallback}
 
     # Answer question endpoint - routes for both v1 and ai paths for compatibility
     @app.post("/api/v1/ask")
     @app.post("/api/v1/ai/ask")
     async def ask_question(request: FieldQuestionRequest):
-        logger.info(f"Ask question called: {request.question}")
+        logger.info("Ask question called: %s", request.question)
         try:
             # First, try to use HybridCopilot if available and field_context is provided
             if hybrid_copilot and request.field_context:
                 logger.info("Using HybridCopilot for field-specific question")
                 try:
+                    # Serve knowledge base answers from the per-process cache
+                    field_context = request.field_context
+                    response = _cached_hardcoded(
+                        request.question,
+                        field_context.get("name"),
+                        field_context.get("type"),
+                        field_context.get("required")
+                    )
+                    if response:
+                        logger.info("HybridCopilot cached response: %.50s...", response)
+                        return {"response": response, "source": "hybrid"}
+                    
                     response = await hybrid_copilot.get_response(
                         question=request.question,
                         field_context=request.field_context
                     )
-                    logger.info(f"HybridCopilot response: {response[:50]}...")
+                    logger.info("HybridCopilot response: %.50s...", response)
                     return {"response": response, "source": "hybrid"}
                 except Exception as e:
-                    logger.error(f"Error using HybridCopilot: {e}")
+                    logger.error("Error using HybridCopilot: %s", e)
                     logger.info("Falling back to legacy copilot")
             
             # Log request details for debugging
-            logger.info(f"Has field context: {request.field_context is not None}")
-            if request.field_context:
-                logger.info(f"Field context: {json.dumps(request.field_context)[:100]}...")
+            logger.info("Has field context: %s", request.field_context is not None)
+            if request.field_context and logger.isEnabledFor(logging.INFO):
+                logger.info("Field context: %.100s...", json.dumps(request.field_context))
             
             # Check if question is about a specific field
             if request.field_context:
                 logger.info("Asking field-specific question with legacy copilot")
-                response = ai_copilot.ask_question(
+                response = await asyncio.to_thread(
+                    _call_ai_copilot,
+                    ai_copilot.ask_question,
                     question=request.question,
                     field_context=request.field_context
                 )
             else:
                 # General question
                 logger.info("Asking general question with legacy copilot")
-                response = ai_copilot.ask_question(request.question)
+                response = await asyncio.to_thread(_call_ai_copilot, ai_copilot.ask_question, request.question)
                 
-            logger.info(f"Generated response: {response[:50]}...")
+            logger.info("Generated response: %.50s...", response)
             return {"response": response, "source": "legacy"}
         except Exception as e:
-            logger.error(f"Error in ask_question: {e}")
+            logger.error("Error in ask_question: %s", e)
             # Generate fallback response based on question content
-            question_lower = request.question.lower()
+            fallback = _fallback_for(request.question)
             
-            if "password" in question_lower:
-                fallback = "A good password should be at least 12 characters long with a mix of uppercase letters, lowercase letters, numbers, and special characters. Avoid using easily guessable information like your name or birthdate."
-            elif "email" in question_lower:
-                fallback = "The email field is where you enter your email address. This is typically used for account creation, login, and communications from the service."
-            elif "name" in question_lower:
-                fallback = "The name field is for entering your legal name as it appears on official documents. This helps verify your identity and ensures communications are addressed correctly."
-            elif "date" in question_lower or "birth" in question_lower:
-                fallback = "For date fields, enter the date in the format shown (typically MM/DD/YYYY in the US). This information is often used for verification and age-appropriate services."
-            else:
-                fallback = "I'll help you understand this form. Feel free to ask about any specific field you're unsure about."
-            
-            logger.info(f"Using fallback response: {fallback}")
+            logger.info("Using fallback response: %s", fallback)
             return {"response": fallback, "source": "fallback"}
 
     # Validate field endpoint
     @app.post("/api/v1/validate-field")
     async def validate_field(request: ValidationRequest):
-        logger.info(f"Validate field called for field: {request.field_name}, type: {request.field_type}")
+        logger.info("Validate field called for field: %s, type: %s", request.field_name, request.field_type)
         try:
-            result = ai_copilot.validate_field(
+            result = await asyncio.to_thread(
+                _call_ai_copilot,
+                ai_copilot.validate_field,
                 request.field_name,
                 request.field_type,
                 request.value
             )
-            logger.info(f"Validation result: {result}")
+            logger.info("Validation result: %s", result)
             return result
         except Exception as e:
-            logger.error(f"Error in validate_field: {e}")
+            logger.error("Error in validate_field: %s", e)
             # Basic fallback validation
             is_valid = True
             message = "Looks valid."
@@ -272,28 +410,29 @@ else:
                 is_valid = False
                 message = "Password should be at least 8 characters."
                 
-            logger.info(f"Using fallback validation: {is_valid}, {message}")
+            logger.info("Using fallback validation: %s, %s", is_valid, message)
             return {"is_valid": is_valid, "message": message}
 
     # Set form context endpoint
     @app.post("/api/v1/set-context")
     async def set_context(request: Request):
         try:
-            form_data = await request.json()
-            logger.info(f"Set context called with form data (truncated): {str(form_data)[:100]}...")
+            form_data = orjson.loads(await request.body())
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Set context called with form data (truncated): %.100s...", form_data)
             
-            result = ai_copilot.set_form_context(form_data)
-            logger.info(f"Set context result: {result}")
+            result = await asyncio.to_thread(_call_ai_copilot, ai_copilot.set_form_context, form_data)
+            logger.info("Set context result: %s", result)
             return result
         except Exception as e:
-            logger.error(f"Error in set_context: {e}")
+            logger.error("Error in set_context: %s", e)
             return {"status": "error", "message": str(e)}
 
     # Additional endpoint to handle legacy requests
     @app.post("/api/v1/ai/set-form-context")
     async def set_form_context_legacy(request: Request):
         try:
-            data = await request.json()
+            data = orjson.loads(await request.body())
             logger.info("Legacy set_form_context called")
             
             # Extract form_data from the legacy format
@@ -302,10 +441,10 @@ else:
             else:
                 form_data = data
                 
-            result = ai_copilot.set_form_context(form_data)
+            result = await asyncio.to_thread(_call_ai_copilot, ai_copilot.set_form_context, form_data)
             return result
         except Exception as e:
-            logger.error(f"Error in set_form_context_legacy: {e}")
+            logger.error("Error in set_form_context_legacy: %s", e)
             return {"status": "error", "message": str(e)}
 
 # Add health check endpoints that will work regardless of which routes are used
@@ -353,27 +492,61 @@ async def process_form_upload(request: Request):
     """Handle uploaded form files."""
     logger.info("Process form upload endpoint called")
     try:
-        # Get the file content from the request
-        form_data = await request.form()
-        file = form_data.get("file")
-        
-        if not file:
-            raise HTTPException(status_code=400, detail="No file uploaded")
-        
-        content_type = form_data.get("content_type") or file.content_type
+        with tempfile.TemporaryDirectory() as upload_dir:
+            # Stream the multipart body straight to disk instead of buffering it in memory
+            upload_path = os.path.join(upload_dir, "upload")
+            file_target = FileTarget(upload_path)
+            content_type_target = ValueTarget()
+            
+            parser = StreamingFormDataParser(headers=request.headers)
+            parser.register("file", file_target)
+            parser.register("content_type", content_type_target)
+            # FileTarget writes synchronously, so feed the parser off the event loop
+            async for chunk in request.stream():
+                await asyncio.to_thread(parser.data_received, chunk)
+            
+            if not file_target.multipart_filename or not os.path.exists(upload_path):
+                raise HTTPException(status_code=400, detail="No file uploaded")
+            
+            content_type = content_type_target.value.decode() or file_target.multipart_content_type
+            
+            if content_type and "pdf" in content_type:
+                try:
+                    return await _process_pdf_upload(upload_path)
+                except MISSING_TOOL_ERRORS as e:
+                    logger.warning("PDF processing dependencies not available: %s", e)
         
-        # For now, return a basic response (you'll implement full processing later)
-        return {
-            "form_type": "pdf_form",
-            "fields": [
-                {"name": "sample_name", "type": "text", "label": "Name"},
-                {"name": "sample_email", "type": "email", "label": "Email"}
-            ]
-        }
+        # Fall back to a basic response when the upload can't be processed
+        return _UPLOAD_STUB_RESPONSE
     except Exception as e:
-        logger.error(f"Error in process_form_upload: {e}")
+        logger.error("Error in process_form_upload: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+async def _process_pdf_upload(pdf_path):
+    """
+    Extract fields from an uploaded PDF, OCRing its pages in parallel.
+    
+    Args:
+        pdf_path: Path to the uploaded PDF file
+        
+    Returns:
+        dict: The same result PDFFormProcessor.extract_fields gives
+    """
+    processor = get_factory().get_processor("application/pdf")
+    loop = asyncio.get_running_loop()
+    
+    with tempfile.TemporaryDirectory() as output_folder:
+        # Render the pages to disk off the event loop, then hand the OCR pool
+        # one page file per task - page images are never loaded in this process
+        page_paths = await asyncio.to_thread(processor.render_pages, pdf_path, output_folder)
+        pages = await asyncio.gather(*(
+            loop.run_in_executor(_ocr_pool, analyze_page_file, page_path, page_idx)
+            for page_idx, page_path in enumerate(page_paths)
+        ))
+    logger.info("OCR completed for %s pages", len(pages))
+    
+    return processor.build_result(pages)
+
 @app.post("/api/ask")
 async def ask_compat(request: FieldQuestionRequest):
     """Compatibility endpoint for ask."""
@@ -385,5 +558,15 @@ async def ask_compat(request: FieldQuestionRequest):
 if __name__ == "__main__":
     import uvicorn
     logger.info("Starting Form Helper API server")
-    # Run on port 8000
-    uvicorn.run(app, host="127.0.0.1", port=8000)
\ No newline at end of file
+    # AICopilot keeps the form context from /set-context in process memory, so
+    # more workers (SERVER_WORKERS) only suit clients that don't rely on it.
+    # loop="auto" picks uvloop where it is installed (not on Windows)
+    uvicorn.run(
+        "test_server:app",
+        host="127.0.0.1",
+        port=8000,
+        workers=int(os.getenv("SERVER_WORKERS", "1")),
+        loop="auto",
+        http="httptools",
+        log_level="info"
+    )
\ No newline at end of file
@@ -7,12 +7,23 @@ This allows you to test various form-related questions with different contexts.
 import os
 import asyncio
 import logging
-import json
 import sys
+import argparse
 from datetime import datetime
-from typing import Dict, Any, List
+from typing import TYPE_CHECKING, Dict, Any, List
 
-from core.ai.smart_copilot import SmartCopilot
+import pytest
+
+from core.ai.http_session import create_session
+from core.ai.prompt_cache import PromptCache
+from copilot_harness import (
+    MAX_CONCURRENT_REQUESTS, cache_enabled, dump_json_line, get_cached_response, is_cached, requires_api_key
+)
+
+# The copilot and the semantic cache pull in heavy dependencies, so they are
+# imported inside test_smart_copilot() rather than at collection time
+if TYPE_CHECKING:
+    from core.ai.smart_copilot import SmartCopilot
 
 # Configure logging
 logging.basicConfig(
@@ -24,7 +35,7 @@ logger = logging.getLogger("test_smart_copilot")
 # Test data: Sample form contexts
 REGISTRATION_FORM = {
     "form_type": "registration",
-    "fields": [
+    "fields": (
         {"name": "username", "type": "text", "label": "Username", "required": True},
         {"name": "email", "type": "email", "label": "Email Address", "required": True},
         {"name": "password", "type": "password", "label": "Password", "required": True},
@@ -33,12 +44,12 @@ REGISTRATION_FORM = {
         {"name": "last_name", "type": "text", "label": "Last Name", "required": True},
         {"name": "dob", "type": "date", "label": "Date of Birth", "required": True},
         {"name": "agree_terms", "type": "checkbox", "label": "I agree to the Terms of Service", "required": True}
-    ]
+    )
 }
 
 PAYMENT_FORM = {
     "form_type": "payment",
-    "fields": [
+    "fields": (
         {"name": "card_number", "type": "text", "label": "Card Number", "required": True},
         {"name": "card_name", "type": "text", "label": "Name on Card", "required": True},
         {"name": "expiration", "type": "text", "label": "Expiration Date (MM/YY)", "required": True},
@@ -49,110 +60,204 @@ PAYMENT_FORM = {
         {"name": "billing_zip", "type": "text", "label": "ZIP/Postal Code", "required": True},
         {"name": "billing_country", "type": "select", "label": "Country", "required": True},
         {"name": "save_card", "type": "checkbox", "label": "Save card for future purchases", "required": False}
-    ]
+    )
 }
 
-# Test cases - format: (question, field_name, field_type, form_context, description)
-TEST_CASES = [
+# Field contexts shared by the test cases
+FIELD_CONTEXTS = {
+    name: {"name": name, "type": field_type}
+    for name, field_type in (
+        ("email", "email"),
+        ("password", "password"),
+        ("confirm_password", "password"),
+        ("username", "text"),
+        ("cvv", "text"),
+        ("card_number", "text"),
+        ("billing_address", "text")
+    )
+}
+
+# Test cases - format: (question, field_context, form_context, description)
+# Field contexts are looked up once here, so every case shares the same dicts
+TEST_CASES = (
     # Basic field questions with no context
-    ("What is this field for?", "email", "email", None, "Basic email field explanation"),
-    ("Is this secure?", "password", "password", None, "Basic password security question"),
+    ("What is this field for?", FIELD_CONTEXTS["email"], None, "Basic email field explanation"),
+    ("Is this secure?", FIELD_CONTEXTS["password"], None, "Basic password security question"),
     
     # Registration form questions
-    ("Why do I need to confirm my password?", "confirm_password", "password", REGISTRATION_FORM, "Purpose of confirmation field"),
-    ("What's the difference between username and email?", "username", "text", REGISTRATION_FORM, "Field relationship question"),
-    ("What happens if I forget my password?", None, None, REGISTRATION_FORM, "Form process question"),
-    ("How secure is this registration form?", None, None, REGISTRATION_FORM, "Form security question"),
+    ("Why do I need to confirm my password?", FIELD_CONTEXTS["confirm_password"], REGISTRATION_FORM, "Purpose of confirmation field"),
+    ("What's the difference between username and email?", FIELD_CONTEXTS["username"], REGISTRATION_FORM, "Field relationship question"),
+    ("What happens if I forget my password?", None, REGISTRATION_FORM, "Form process question"),
+    ("How secure is this registration form?", None, REGISTRATION_FORM, "Form security question"),
     
     # Payment form questions
-    ("Where do I find my CVV code?", "cvv", "text", PAYMENT_FORM, "Format guidance"),
-    ("Is it safe to enter my credit card here?", "card_number", "text", PAYMENT_FORM, "Security concern"),
-    ("Why do you need my billing address?", "billing_address", "text", PAYMENT_FORM, "Purpose explanation"),
-    ("What's the relationship between my card number and CVV?", "card_number", "text", PAYMENT_FORM, "Field relationship")
-]
+    ("Where do I find my CVV code?", FIELD_CONTEXTS["cvv"], PAYMENT_FORM, "Format guidance"),
+    ("Is it safe to enter my credit card here?", FIELD_CONTEXTS["card_number"], PAYMENT_FORM, "Security concern"),
+    ("Why do you need my billing address?", FIELD_CONTEXTS["billing_address"], PAYMENT_FORM, "Purpose explanation"),
+    ("What's the relationship between my card number and CVV?", FIELD_CONTEXTS["card_number"], PAYMENT_FORM, "Field relationship")
+)
 
-async def test_smart_copilot():
-    """Run tests for SmartCopilot's enhanced AI capabilities."""
-    logger.info("=== TESTING SMART COPILOT'S ENHANCED AI CAPABILITIES ===")
+async def run_case(copilot: "SmartCopilot", caches, semaphore, results_fp, i, case):
+    """
+    Run a single test case, appending its result to the results file as soon as it finishes.
     
-    # Create SmartCopilot instance
-    copilot = SmartCopilot()
+    Returns:
+        tuple: Result dict and the log lines for this case
+    """
+    question, field_context, form_context, description = case
+    log_lines = [f"\n\nTest {i+1}: {description}", f"Question: {question}"]
     
-    # Test API connection first
-    connection_result = await copilot.test_api_connection()
-    if not connection_result.get("success", False):
-        logger.error(f"API connection test failed: {connection_result.get('error', 'Unknown error')}")
-        logger.error("Ensure your API key is correctly set in the environment variables")
-        return
+    if field_context:
+        log_lines.append(f"Field: {field_context['name']} ({field_context['type']})")
     
-    logger.info(f"API connection test successful: {connection_result.get('response')}")
+    if form_context:
+        log_lines.append(f"Form type: {form_context.get('form_type', 'Unknown')}")
     
-    # Create results directory
-    results_dir = os.path.join(os.path.dirname(__file__), "test_results")
-    os.makedirs(results_dir, exist_ok=True)
+    # Get response
+    try:
+        async with semaphore:
+            result, cache_hit = await get_cached_response(copilot, caches, question, field_context, form_context)
+        
+        # Log results
+        log_lines.append(f"Response from {result.get('source', 'unknown')}:")
+        log_lines.append(result.get("response", "No response"))
+        log_lines.append(f"Processing time: {result.get('processing_time', 0):.3f} seconds")
+        
+        record = {
+            "test_number": i + 1,
+            "description": description,
+            "question": question,
+            "field_context": field_context,
+            "form_type": form_context.get("form_type") if form_context else None,
+            "response": result.get("response"),
+            "source": result.get("source"),
+            "model": result.get("model", "N/A"),
+            "processing_time": result.get("processing_time"),
+            "processing_time_ns": result.get("processing_time_ns"),
+            "enhanced_context_used": result.get("enhanced_context_used", False),
+            "cache_hit": cache_hit
+        }
+        
+    except Exception as e:
+        log_lines.append(f"Error testing question: {str(e)}")
+        record = {
+            "test_number": i + 1,
+            "description": description,
+            "question": question,
+            "error": str(e)
+        }
     
-    # Create results file with timestamp
-    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    results_file = os.path.join(results_dir, f"copilot_test_{timestamp}.json")
+    # A plain write never yields to the event loop, so concurrent cases can't interleave lines
+    results_fp.write(dump_json_line(record))
+    return record, log_lines
+
+@requires_api_key
+@pytest.mark.asyncio
+async def test_smart_copilot(use_cache=None):
+    """
+    Run tests for SmartCopilot's enhanced AI capabilities.
+    
+    Args:
+        use_cache: Reuse responses from earlier runs; None defers to cache_enabled()
+    """
+    logger.info("=== TESTING SMART COPILOT'S ENHANCED AI CAPABILITIES ===")
     
-    # Run test cases
-    results = []
-    for i, (question, field_name, field_type, form_context, description) in enumerate(TEST_CASES):
-        logger.info(f"\n\nTest {i+1}: {description}")
-        logger.info(f"Question: {question}")
+    # One HTTP session (and connection pool) shared by every API call
+    session = create_session(disable_ssl_verification=True)
+    caches = None
+    try:
+        from core.ai.smart_copilot import SmartCopilot
         
-        # Create field context if we have field info
-        field_context = None
-        if field_name and field_type:
-            field_context = {"name": field_name, "type": field_type}
-            logger.info(f"Field: {field_name} ({field_type})")
+        # Create SmartCopilot instance
+        copilot = SmartCopilot(session=session)
         
-        if form_context:
-            logger.info(f"Form type: {form_context.get('form_type', 'Unknown')}")
+        # Create results directory
+        results_dir = os.path.join(os.path.dirname(__file__), "test_results")
+        os.makedirs(results_dir, exist_ok=True)
         
-        # Get response
-        try:
-            result = await copilot.get_response(question, field_context, form_context)
+        # Create results file with timestamp
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        results_file = os.path.join(results_dir, f"copilot_test_{timestamp}.jsonl")
+        
+        # Identical and similar questions reuse earlier responses, across runs too
+        if cache_enabled(use_cache):
+            from core.ai.semantic_cache import SemanticCache
             
-            # Log results
-            logger.info(f"Response from {result.get('source', 'unknown')}:")
-            logger.info(result.get("response", "No response"))
-            logger.info(f"Processing time: {result.get('processing_time', 0):.2f} seconds")
+            caches = (
+                PromptCache(os.path.join(results_dir, ".prompt_cache")),
+                SemanticCache(os.path.join(results_dir, "semantic_cache.pkl"))
+            )
+        
+        # Test API connection first, unless every case will be served from a cache
+        if caches and all(
+            is_cached(caches, question, field_context, form_context)
+            for question, field_context, form_context, _ in TEST_CASES
+        ):
+            logger.info("All cases cached - skipping API probe")
+        else:
+            connection_result = await copilot.test_api_connection()
+            assert connection_result.get("success", False), (
+                f"API connection test failed: {connection_result.get('error', 'Unknown error')}. "
+                "Ensure your API key is correctly set in the environment variables"
+            )
             
-            # Add to results
-            results.append({
-                "test_number": i + 1,
-                "description": description,
-                "question": question,
-                "field_context": field_context,
-                "form_type": form_context.get("form_type") if form_context else None,
-                "response": result.get("response"),
-                "source": result.get("source"),
-                "model": result.get("model", "N/A"),
-                "processing_time": result.get("processing_time"),
-                "enhanced_context_used": result.get("enhanced_context_used", False)
-            })
+            logger.info(f"API connection test successful: {connection_result.get('response')}")
+        
+        # Run test cases concurrently, limiting in-flight API calls. Results are
+        # streamed to a JSON Lines file (one object per line) as each case finishes.
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        failed = []
+        with open(results_file, "wb") as results_fp:
+            outcomes = await asyncio.gather(
+                *(run_case(copilot, caches, semaphore, results_fp, i, case) for i, case in enumerate(TEST_CASES)),
+                return_exceptions=True
+            )
             
-        except Exception as e:
-            logger.error(f"Error testing question: {str(e)}")
-            results.append({
-                "test_number": i + 1,
-                "description": description,
-                "question": question,
-                "error": str(e)
-            })
-    
-    # Save results
-    with open(results_file, "w") as f:
-        json.dump(results, f, indent=2)
-    
-    logger.info(f"\n\nAll tests completed. Results saved to {results_file}")
-    
-    # Print stats
-    stats = copilot.get_stats()
-    logger.info("\nSmartCopilot Statistics:")
-    for key, value in stats.items():
-        logger.info(f"  {key}: {value}")
+            # Emit each case's log lines in order once all cases are done, as one
+            # record per case so its block stays contiguous
+            for i, outcome in enumerate(outcomes):
+                if isinstance(outcome, BaseException):
+                    logger.error(f"Error running test {i+1}: {str(outcome)}")
+                    results_fp.write(dump_json_line({"test_number": i + 1, "error": str(outcome)}))
+                    failed.append(i + 1)
+                    continue
+                
+                result, log_lines = outcome
+                if "error" in result or not result.get("response"):
+                    failed.append(i + 1)
+                level = logging.ERROR if "error" in result else logging.INFO
+                if logger.isEnabledFor(level):
+                    logger.log(level, "\n".join(map(str, log_lines)))
+        
+        if caches:
+            caches[1].save()
+        
+        logger.info(f"\n\nAll tests completed. Results saved to {results_file}")
+        
+        # Print stats
+        stats = copilot.get_stats()
+        logger.info("\nSmartCopilot Statistics:")
+        for key, value in stats.items():
+            logger.info(f"  {key}: {value}")
+        if caches:
+            logger.info(f"Prompt cache: {caches[0].get_stats()}")
+            logger.info(f"Semantic cache: {caches[1].get_stats()}")
+        
+        assert not failed, f"Test cases without a response: {failed}"
+    finally:
+        if caches:
+            caches[0].close()
+        await session.close()
 
 if __name__ == "__main__":
-    asyncio.run(test_smart_copilot())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Test SmartCopilot's enhanced AI capabilities")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached responses and call the API for every case")
+    args = parser.parse_args()
+    
+    async def _main():
+        # Start gathered cases eagerly so cache hits finish without an extra loop iteration
+        if sys.version_info >= (3, 12):
+            asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+        await test_smart_copilot(use_cache=not args.no_cache)
+    
+    asyncio.run(_main())
\ No newline at end of file
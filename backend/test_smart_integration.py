@@ -6,14 +6,26 @@ This script simulates a form request and tests if the system can provide
 enhanced responses using the SmartCopilot.
 """
 
+import os
+import sys
 import asyncio
+import argparse
 import logging
-import json
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any
 
-# Import both copilot systems
-from core.ai.hybrid_copilot import HybridCopilot
-from core.ai.smart_copilot import SmartCopilot
+import pytest
+
+from core.ai.http_session import create_session
+from core.ai.prompt_cache import PromptCache
+from core.ai.capabilities import SMART_CAPS
+from copilot_harness import (
+    MAX_CONCURRENT_REQUESTS, cache_enabled, dump_json, dump_json_line, get_cached_response, is_cached, requires_api_key
+)
+
+# Both copilot systems and the semantic cache pull in heavy dependencies, so
+# they are imported inside test_copilot_integration() rather than at collection time
+if TYPE_CHECKING:
+    from core.ai.hybrid_copilot import HybridCopilot
 
 # Configure logging
 logging.basicConfig(
@@ -25,7 +37,7 @@ logger = logging.getLogger("test_smart_integration")
 # Sample form data for testing
 REGISTRATION_FORM = {
     "form_type": "registration",
-    "fields": [
+    "fields": (
         {"name": "firstName", "type": "text", "label": "First Name", "required": True},
         {"name": "lastName", "type": "text", "label": "Last Name", "required": True},
         {"name": "email", "type": "email", "label": "Email Address", "required": True},
@@ -39,11 +51,14 @@ REGISTRATION_FORM = {
         {"name": "bio", "type": "textarea", "label": "About Yourself", "required": False},
         {"name": "terms", "type": "checkbox", "label": "Terms and Conditions", "required": True},
         {"name": "newsletter", "type": "checkbox", "label": "Subscribe to newsletter", "required": False}
-    ]
+    )
 }
 
+# Field contexts shared by the test cases, taken from the form definition
+FIELD_CONTEXTS = {field["name"]: field for field in REGISTRATION_FORM["fields"]}
+
 # Test cases
-TEST_QUESTIONS = [
+TEST_QUESTIONS = (
     {
         "question": "What is this form for?",
         "field_context": None,
@@ -51,17 +66,17 @@ TEST_QUESTIONS = [
     },
     {
         "question": "Why do you need my email?",
-        "field_context": {"name": "email", "type": "email", "label": "Email Address", "required": True},
+        "field_context": FIELD_CONTEXTS["email"],
         "description": "Email field question"
     },
     {
         "question": "Is it secure to enter my password here?",
-        "field_context": {"name": "password", "type": "password", "label": "Password", "required": True},
+        "field_context": FIELD_CONTEXTS["password"],
         "description": "Security question about password"
     },
     {
         "question": "Why do I need to confirm my password?",
-        "field_context": {"name": "confirmPassword", "type": "password", "label": "Confirm Password", "required": True},
+        "field_context": FIELD_CONTEXTS["confirmPassword"],
         "description": "Question about confirm password field"
     },
     {
@@ -69,84 +84,52 @@ TEST_QUESTIONS = [
         "field_context": None,
         "description": "Privacy question about form submission"
     }
-]
+)
 
-async def test_copilot_integration():
-    """Test the integration between HybridCopilot and SmartCopilot."""
-    logger.info("=== TESTING ENHANCED COPILOT INTEGRATION ===")
-    
-    # Create both copilot instances
-    hybrid_copilot = HybridCopilot()
+# Cache files live beside the SmartCopilot harness's, but apart from them
+# since HybridCopilot can return plain strings
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "test_results")
+
+# One JSON object per line, written as each case finishes
+RESULTS_FILE = os.path.join(RESULTS_DIR, "smart_integration_results.jsonl")
+
+async def run_question(hybrid_copilot: "HybridCopilot", caches, semaphore, results_fp, i, test_case):
+    """
+    Run a single test question through HybridCopilot, appending its result
+    to the results file as soon as it finishes.
     
-    # Only create SmartCopilot if needed
-    smart_copilot = None
-    try:
-        smart_copilot = SmartCopilot()
-        logger.info("Both copilot systems initialized")
-    except ImportError:
-        logger.warning("SmartCopilot not available - only testing HybridCopilot")
+    Returns:
+        tuple: Result dict and the log lines for this case
+    """
+    question = test_case["question"]
+    field_context = test_case["field_context"]
+    description = test_case["description"]
     
-    # Test API connection
-    connection_result = await hybrid_copilot.test_api_connection()
-    if not connection_result:
-        logger.error("API connection test failed - cannot proceed with testing")
-        return
+    log_lines = [f"\n\nTest {i+1}: {description}", f"Question: {question}"]
     
-    logger.info(f"API connection successful: {connection_result}")
+    if field_context:
+        log_lines.append(f"Field: {field_context.get('name')} ({field_context.get('type')})")
     
-    # Test direct access to the SmartCopilot for comparison
-    if smart_copilot:
-        logger.info("\n=== TESTING SMARTCOPILOT DIRECTLY ===")
-        example_question = "Why do I need to confirm my password?"
-        example_field = {"name": "confirmPassword", "type": "password", "label": "Confirm Password", "required": True}
-        
-        logger.info(f"Question: {example_question}")
-        logger.info(f"Field: {example_field.get('name')} ({example_field.get('type')})")
-        
-        direct_result = await smart_copilot.get_response(
-            question=example_question,
-            field_context=example_field,
-            form_context=REGISTRATION_FORM
+    # Get response from HybridCopilot (should utilize SmartCopilot if available)
+    log_lines.append("Getting response from HybridCopilot...")
+    async with semaphore:
+        hybrid_result, cache_hit = await get_cached_response(
+            hybrid_copilot, caches, question, field_context, REGISTRATION_FORM
         )
-        
-        logger.info("SmartCopilot direct response:")
-        if isinstance(direct_result, dict):
-            source = direct_result.get("source", "smart")
-            logger.info(f"Source: {source}")
-            logger.info(f"Response: {direct_result.get('response', 'No response')}")
-            logger.info(f"Metadata: {json.dumps({k: v for k, v in direct_result.items() if k != 'response'}, indent=2)}")
-        else:
-            logger.info(f"Response: {direct_result}")
     
-    # Run test cases
-    results = []
-    for i, test_case in enumerate(TEST_QUESTIONS):
-        question = test_case["question"]
-        field_context = test_case["field_context"]
-        description = test_case["description"]
-        
-        logger.info(f"\n\nTest {i+1}: {description}")
-        logger.info(f"Question: {question}")
-        
-        if field_context:
-            logger.info(f"Field: {field_context.get('name')} ({field_context.get('type')})")
-        
-        # Get response from HybridCopilot (should utilize SmartCopilot if available)
-        logger.info("Getting response from HybridCopilot...")
-        hybrid_result = await hybrid_copilot.get_response(
-            question=question,
-            field_context=field_context,
-            form_context=REGISTRATION_FORM
-        )
+    log_lines.append("Response details:")
+    if isinstance(hybrid_result, dict):
+        # This likely came from SmartCopilot
+        source = hybrid_result.get("source", "unknown")
+        log_lines.append(f"Source: {source}")
+        log_lines.append(hybrid_result.get("response", "No response"))
         
-        logger.info("Response details:")
-        if isinstance(hybrid_result, dict):
-            # This likely came from SmartCopilot
-            source = hybrid_result.get("source", "unknown")
-            logger.info(f"Source: {source}")
-            logger.info(hybrid_result.get("response", "No response"))
-            
-            # Check if we got an enhanced response from SmartCopilot
+        # Check if we got an enhanced response from SmartCopilot
+        capabilities = hybrid_result.get("capabilities")
+        if capabilities is not None:
+            used_smart = bool(capabilities & SMART_CAPS)
+        else:
+            # Responses without a capabilities mask (e.g. cached from older runs)
             enhanced_contexts = hybrid_result.get("context_enhancement", [])
             enhanced_metadata = hybrid_result.get("metadata", {})
             smart_model = hybrid_result.get("model", "")
@@ -160,42 +143,170 @@ async def test_copilot_integration():
                 smart_model.startswith("gpt-4") or
                 isinstance(enhanced_metadata, dict) and len(enhanced_metadata) > 0
             )
+        
+        log_lines.append(f"Used SmartCopilot capabilities: {used_smart}")
+        
+        record = {
+            "test_number": i + 1,
+            "description": description,
+            "question": question,
+            "field_context": field_context,
+            "response_type": "enhanced" if used_smart else "standard",
+            "source": source,
+            "response": hybrid_result.get("response", "No response"),
+            "cache_hit": cache_hit
+        }
+    else:
+        # This is a plain string response from HybridCopilot
+        log_lines.append(f"Source: regular HybridCopilot")
+        log_lines.append(hybrid_result)
+        
+        record = {
+            "test_number": i + 1,
+            "description": description,
+            "question": question,
+            "field_context": field_context,
+            "response_type": "standard",
+            "source": "hybrid_copilot",
+            "response": hybrid_result,
+            "cache_hit": cache_hit
+        }
+    
+    # A plain write never yields to the event loop, so concurrent cases can't interleave lines
+    results_fp.write(dump_json_line(record))
+    return record, log_lines
+
+@requires_api_key
+@pytest.mark.asyncio
+async def test_copilot_integration(use_cache=None):
+    """
+    Test the integration between HybridCopilot and SmartCopilot.
+    
+    Args:
+        use_cache: Reuse responses from earlier runs; None defers to cache_enabled()
+    """
+    logger.info("=== TESTING ENHANCED COPILOT INTEGRATION ===")
+    
+    # One HTTP session (and connection pool) shared by every API call
+    session = create_session(disable_ssl_verification=True)
+    caches = None
+    try:
+        from core.ai.hybrid_copilot import HybridCopilot
+        
+        # Create both copilot instances
+        hybrid_copilot = HybridCopilot(session=session)
+        
+        # Only create SmartCopilot if needed
+        smart_copilot = None
+        try:
+            from core.ai.smart_copilot import SmartCopilot
             
-            logger.info(f"Used SmartCopilot capabilities: {used_smart}")
+            smart_copilot = SmartCopilot(session=session)
+            logger.info("Both copilot systems initialized")
+        except ImportError:
+            logger.warning("SmartCopilot not available - only testing HybridCopilot")
+        
+        # Identical and similar questions reuse earlier responses, across runs too
+        if cache_enabled(use_cache):
+            from core.ai.semantic_cache import SemanticCache
             
-            results.append({
-                "test_number": i + 1,
-                "description": description,
-                "question": question,
-                "field_context": field_context,
-                "response_type": "enhanced" if used_smart else "standard",
-                "source": source,
-                "response": hybrid_result.get("response", "No response")
-            })
+            caches = (
+                PromptCache(os.path.join(RESULTS_DIR, ".hybrid_prompt_cache")),
+                SemanticCache(os.path.join(RESULTS_DIR, "hybrid_semantic_cache.pkl"))
+            )
+        
+        # Only probe the API if some test question would actually call it
+        if caches and all(
+            is_cached(caches, test_case["question"], test_case["field_context"], REGISTRATION_FORM)
+            for test_case in TEST_QUESTIONS
+        ):
+            logger.info("All cases cached - skipping API probe")
         else:
-            # This is a plain string response from HybridCopilot
-            logger.info(f"Source: regular HybridCopilot")
-            logger.info(hybrid_result)
+            connection_result = await hybrid_copilot.test_api_connection()
+            assert connection_result.get("success", False), (
+                f"API connection test failed: {connection_result.get('error', 'Unknown error')}"
+            )
             
-            results.append({
-                "test_number": i + 1,
-                "description": description,
-                "question": question,
-                "field_context": field_context,
-                "response_type": "standard",
-                "source": "hybrid_copilot",
-                "response": hybrid_result
-            })
-    
-    # Save results
-    with open("smart_integration_results.json", "w") as f:
-        json.dump(results, f, indent=2)
-    
-    logger.info("\n\nAll tests completed. Results saved to smart_integration_results.json")
-    
-    # Print summary
-    enhanced_count = sum(1 for r in results if r["response_type"] == "enhanced")
-    logger.info(f"Summary: {enhanced_count}/{len(results)} responses used enhanced capabilities")
+            logger.info(f"API connection successful: {connection_result}")
+        
+        # Test direct access to the SmartCopilot for comparison
+        if smart_copilot:
+            logger.info("\n=== TESTING SMARTCOPILOT DIRECTLY ===")
+            example_question = "Why do I need to confirm my password?"
+            example_field = FIELD_CONTEXTS["confirmPassword"]
+        
+            logger.info(f"Question: {example_question}")
+            logger.info(f"Field: {example_field.get('name')} ({example_field.get('type')})")
+        
+            direct_result = await smart_copilot.get_response(
+                question=example_question,
+                field_context=example_field,
+                form_context=REGISTRATION_FORM
+            )
+        
+            logger.info("SmartCopilot direct response:")
+            if isinstance(direct_result, dict):
+                source = direct_result.get("source", "smart")
+                logger.info(f"Source: {source}")
+                logger.info(f"Response: {direct_result.get('response', 'No response')}")
+                logger.info(f"Metadata: {dump_json({k: v for k, v in direct_result.items() if k != 'response'}).decode()}")
+            else:
+                logger.info(f"Response: {direct_result}")
+        
+        # Run test cases concurrently, limiting in-flight API calls. Results are
+        # streamed to a JSON Lines file (one object per line) as each case finishes.
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_REQUESTS)
+        enhanced_count = 0
+        failed = []
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        with open(RESULTS_FILE, "wb") as results_fp:
+            outcomes = await asyncio.gather(
+                *(run_question(hybrid_copilot, caches, semaphore, results_fp, i, test_case) for i, test_case in enumerate(TEST_QUESTIONS)),
+                return_exceptions=True
+            )
+            
+            # Emit each case's log lines in order once all cases are done, as one
+            # record per case so its block stays contiguous
+            for i, outcome in enumerate(outcomes):
+                if isinstance(outcome, BaseException):
+                    logger.error(f"Error running test {i+1}: {str(outcome)}")
+                    results_fp.write(dump_json_line({"test_number": i + 1, "response_type": "error", "error": str(outcome)}))
+                    failed.append(i + 1)
+                    continue
+                
+                result, log_lines = outcome
+                if not result["response"] or result["response"] == "No response":
+                    failed.append(i + 1)
+                if logger.isEnabledFor(logging.INFO):
+                    logger.info("\n".join(map(str, log_lines)))
+                enhanced_count += result["response_type"] == "enhanced"
+        
+        if caches:
+            caches[1].save()
+        
+        logger.info(f"\n\nAll tests completed. Results saved to {RESULTS_FILE}")
+        
+        # Print summary
+        logger.info(f"Summary: {enhanced_count}/{len(outcomes)} responses used enhanced capabilities")
+        if caches:
+            logger.info(f"Prompt cache: {caches[0].get_stats()}")
+            logger.info(f"Semantic cache: {caches[1].get_stats()}")
+        
+        assert not failed, f"Test cases without a response: {failed}"
+    finally:
+        if caches:
+            caches[0].close()
+        await session.close()
 
 if __name__ == "__main__":
-    asyncio.run(test_copilot_integration())
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Test the HybridCopilot/SmartCopilot integration")
+    parser.add_argument("--no-cache", action="store_true", help="Ignore cached responses and call the API for every case")
+    args = parser.parse_args()
+    
+    async def _main():
+        # Start gathered cases eagerly so cache hits finish without an extra loop iteration
+        if sys.version_info >= (3, 12):
+            asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+        await test_copilot_integration(use_cache=not args.no_cache)
+    
+    asyncio.run(_main())
\ No newline at end of file
@@ -4,9 +4,10 @@ from backend.core.form_processor.html_processor import HTMLFormProcessor
 from backend.core.form_processor.pdf_processor import PDFFormProcessor
 
 class TestFormProcessorFactory(unittest.TestCase):
-    def setUp(self):
-        """Set up test fixtures"""
-        self.factory = FormProcessorFactory()
+    @classmethod
+    def setUpClass(cls):
+        """Set up test fixtures once for the class"""
+        cls.factory = FormProcessorFactory()
     
     def test_get_html_processor(self):
         """Test that the factory returns an HTML processor for HTML content"""
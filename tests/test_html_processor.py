@@ -1,13 +1,15 @@
 import unittest
-from backend.core.form_processor.html_processor import HTMLFormProcessor
+from bs4 import BeautifulSoup
+from backend.core.form_processor.html_processor import HTMLFormProcessor, HTML_PARSER
 
 class TestHTMLProcessor(unittest.TestCase):
-    def setUp(self):
-        """Set up test fixtures"""
-        self.processor = HTMLFormProcessor()
+    @classmethod
+    def setUpClass(cls):
+        """Set up test fixtures once for the class"""
+        cls.processor = HTMLFormProcessor()
         
         # Sample HTML form for testing
-        self.sample_html = """
+        cls.sample_html = """
         <form>
             <label for="name">Full Name:</label>
             <input type="text" id="name" name="fullname">
@@ -19,10 +21,13 @@ class TestHTMLProcessor(unittest.TestCase):
             <input type="tel" id="phone" name="phone">
         </form>
         """
+        
+        # Parse the sample once; tests that don't exercise parsing reuse it
+        cls._parsed = BeautifulSoup(cls.sample_html, HTML_PARSER)
     
     def test_extract_fields(self):
         """Test basic extraction of form fields"""
-        result = self.processor.extract_fields(self.sample_html)
+        result = self.processor.extract_fields_from_soup(self._parsed)
         
         # Check if result has the expected structure
         self.assertIn("fields", result)
@@ -41,5 +46,11 @@ class TestHTMLProcessor(unittest.TestCase):
             elif field.get("name") == "phone":
                 self.assertEqual(field.get("type"), "tel")
 
+    def test_extract_fields_from_html(self):
+        """Test that parsing raw HTML gives the same fields as the parsed soup"""
+        result = self.processor.extract_fields(self.sample_html)
+        expected = self.processor.extract_fields_from_soup(self._parsed)
+        self.assertEqual(result["fields"], expected["fields"])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file